@@ -0,0 +1,47 @@
+import os
+import json
+import struct
+import argparse
+
+def convert(bin_file, csv_file=None):
+    """
+    Convert a binary flight data file to CSV using its JSON header
+
+    Args:
+        bin_file (str): Path to the data_NNNN.bin file
+        csv_file (str, optional): Output path, defaults to the .bin path with a .csv extension
+
+    Returns:
+        str: Path of the written CSV file
+    """
+    base = os.path.splitext(bin_file)[0]
+    with open(base + '.json') as f:
+        header = json.load(f)
+    fmt = header['format']
+    size = struct.calcsize(fmt)
+    csv_file = csv_file or base + '.csv'
+
+    with open(bin_file, 'rb') as f:
+        data = f.read()
+    # A partially written final record is dropped
+    data = data[:len(data) - len(data) % size]
+
+    with open(csv_file, 'w') as f:
+        f.write(','.join(header['fields']) + '\n')
+        for record in struct.iter_unpack(fmt, data):
+            # Nine significant digits round-trip every float32 value exactly
+            f.write(','.join(f"{v:.9g}" if isinstance(v, float) else str(v) for v in record) + '\n')
+
+    return csv_file
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert CanSat binary flight data to CSV')
+    parser.add_argument('bin_file', help='Path to data .bin file')
+    parser.add_argument('--csv_file', help='Output CSV path', default=None)
+
+    args = parser.parse_args()
+
+    print(f"Wrote {convert(args.bin_file, args.csv_file)}")
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,115 @@
 Enhanced BME280 MicroPython driver for RP2040 with improved accuracy and error handling.
 """
 from machine import Pin, I2C
+import array
+import struct
 import time
 import math
 
+try:
+    import micropython
+    from micropython import const
+except ImportError:
+    # Host-side Python: the code emitter decorators become no-ops
+    class micropython:
+        @staticmethod
+        def native(func):
+            return func
+
+    def const(value):
+        return value
+
+# Register map
+_REG_CALIB = const(0x88)
+_REG_CHIP_ID = const(0xD0)
+_REG_RESET = const(0xE0)
+_REG_STATUS = const(0xF3)
+_REG_CTRL_MEAS = const(0xF4)
+_REG_CONFIG = const(0xF5)
+_REG_DATA = const(0xF7)
+
+_CHIP_ID = const(0x60)
+_STATUS_MEASURING = const(0x08)
+_STATUS_IM_UPDATE = const(0x01)
+
+# Register values used by _configure_sensor
+# config: standby 62.5 ms (unused in forced mode), IIR filter coefficient 16
+_CONFIG_VALUE = const((0b001 << 5) | (0b100 << 2))
+# ctrl_meas: temperature oversampling x2, pressure oversampling x16, forced mode
+_CTRL_MEAS_FORCED = const((0b010 << 5) | (0b101 << 2) | 0b01)
+# Typical conversion time for these settings: 1 + 2*T_os + 2*P_os + 0.5 ms
+_MEAS_TIME_MS = const(37)
+
+# Set to True to compile per-sample diagnostics into the sampling path; the
+# debug constructor argument then enables them at runtime
+_DEBUG = const(False)
+
+# Stored in place of missing values by read_all(out=...)
+_NAN = float('nan')
+
+# Size of the warning ring buffer (must be a power of two)
+_WARN_SLOTS = const(8)
+
+# Recent altitudes kept for get_altitude_stats() (must be a power of two)
+_ALT_SLOTS = const(32)
+
+# A 6-byte data burst is ~83 bit times: ~210 us at 400 kHz, ~830 us at 100 kHz
+_FAST_MODE_READ_US = const(500)
+
+
+# Least-squares fit of 44330 * (1 - (1 - u) ** 0.1903) with u = 1 - p / p_ref,
+# valid for u in [-0.05, 0.25] (about -400 m to +2300 m) with under 2 mm error
+_ALT_U_MIN = -0.05
+_ALT_U_MAX = 0.25
+_ALT_C1 = 8435.9726
+_ALT_C2 = 3415.4635
+_ALT_C3 = 2072.5254
+_ALT_C4 = 1271.5061
+_ALT_C5 = 1883.5845
+
+
+# Offsets into the packed calibration array built by _load_calibration
+_CAL_T1_1024 = const(0)
+_CAL_T1_8192 = const(1)
+_CAL_T2 = const(2)
+_CAL_T3 = const(3)
+# Pressure terms: the datasheet's power-of-two scalings are folded into the
+# coefficients, so compensation reduces to three short polynomials
+_CAL_D0 = const(4)  # P1
+_CAL_D1 = const(5)  # P1 * P2 / 2**34
+_CAL_D2 = const(6)  # P1 * P3 / 2**53
+_CAL_O0 = const(7)  # P4 * 16
+_CAL_O1 = const(8)  # P5 / 2**13
+_CAL_O2 = const(9)  # P6 / 2**29
+_CAL_Q0 = const(10)  # P7 / 16
+_CAL_Q1 = const(11)  # 1 + P8 / 2**19
+_CAL_Q2 = const(12)  # P9 / 2**35
+
+
+@micropython.native
+def _compensate_T(raw_T, cal):
+    """Datasheet float temperature compensation; returns the unscaled fine temperature"""
+    # Power-of-two divisions are written as multiplies by their exact reciprocals
+    var1 = (raw_T * 6.103515625e-05 - cal[_CAL_T1_1024]) * cal[_CAL_T2]  # raw_T / 16384
+    var2 = raw_T * 7.62939453125e-06 - cal[_CAL_T1_8192]  # raw_T / 131072
+    return var1 + var2 * var2 * cal[_CAL_T3]
+
+
+@micropython.native
+def _compensate_P(raw_P, t_fine, cal):
+    """Datasheet float pressure compensation; returns pressure in Pa or 0.0 on divide-by-zero"""
+    var1 = t_fine * 0.5 - 64000.0
+    v1v1 = var1 * var1
+    
+    divisor = cal[_CAL_D0] + var1 * cal[_CAL_D1] + v1v1 * cal[_CAL_D2]
+    if divisor == 0:
+        return 0.0  # Avoid division by zero
+    
+    offset = cal[_CAL_O0] + var1 * cal[_CAL_O1] + v1v1 * cal[_CAL_O2]
+    pressure = (1048576.0 - raw_P - offset) * 6250.0 / divisor
+    return (pressure * cal[_CAL_Q2] + cal[_CAL_Q1]) * pressure + cal[_CAL_Q0]
+
+
 class BME280:
     # BME280 default address
     BME280_I2CADDR = 0x76
@@ -23,15 +129,29 @@ class BME280:
     OVERSAMPLE_X8 = 0b100
     OVERSAMPLE_X16 = 0b101
 
-    def __init__(self, i2c, address=None, sea_level_pressure=1013.25, debug=False):
+    # Warning codes recorded by the sampling path, see pop_warnings()
+    WARN_READ_FAILED = 1
+    WARN_TEMP_RANGE = 2
+    WARN_TEMP_INVALID = 3
+    WARN_DEFAULT_T_FINE = 4
+    WARN_PRESSURE_FAILED = 5
+    WARN_PRESSURE_RANGE = 6
+    WARN_ALTITUDE_FAILED = 7
+
+    def __init__(self, i2c, address=None, sea_level_pressure=1013.25, debug=False, track_ground=False):
         """
         Initialize BME280 sensor with advanced calibration and error handling.
         
+        The bus should run in Fast-mode, e.g. I2C(..., freq=400_000); a warning
+        is printed at init if the measured read time suggests a slower clock.
+        
         Args:
             i2c: Initialized I2C object
             address: I2C address (default is to auto-detect)
             sea_level_pressure: Standard sea level pressure in hPa
             debug: Enable verbose debug output
+            track_ground: Reference altitude to a running ground pressure
+                estimate instead of calibrate_ground_level(), see _track_ground()
         """
         self.i2c = i2c
         self.debug = debug
@@ -58,14 +178,31 @@ class BME280:
         self.ground_altitude_offset = 0
         self.t_fine = 0
         
-        # Store multiple ground level readings for more accurate calibration
-        self._ground_pressure_readings = []
-        self._ground_altitude_readings = []
+        # Running ground pressure estimate (hPa) used when track_ground is set
+        self.track_ground = track_ground
+        self.p_ground_ema = None
+        self._inv_ground = 0.0
+        
+        # Ring buffer of (code, value) warnings from the sampling path
+        self._warn_codes = bytearray(_WARN_SLOTS)
+        self._warn_values = array.array('f', bytes(4 * _WARN_SLOTS))
+        self._warn_count = 0
+        
+        # Ring buffer of recent altitudes; _alt_count keeps counting past the size
+        self._alt_history = array.array('f', bytes(4 * _ALT_SLOTS))
+        self._alt_count = 0
+        
+        # Altitude parameters from the last read_all(out=...) made in debug mode
+        self.last_diagnostics = None
+        
+        # Preallocated I2C read buffers keep the sampling path allocation-free
+        self._buf1 = bytearray(1)
+        self._buf6 = bytearray(6)
         
         # Validate device presence and ID
         try:
-            chip_id = self._safe_read_byte(0xD0)
-            if chip_id != 0x60:
+            chip_id = self._safe_read_byte(_REG_CHIP_ID)
+            if chip_id != _CHIP_ID:
                 raise RuntimeError(f'Invalid BME280 Chip ID: 0x{chip_id:02x}')
             print(f"BME280 found with chip ID: 0x{chip_id:02x}")
         except Exception as e:
@@ -73,7 +210,6 @@ class BME280:
         
         # Reset the device
         self._soft_reset()
-        time.sleep(0.1)  # Wait for reset to complete
         
         # Load calibration data
         self._load_calibration()
@@ -81,45 +217,61 @@ class BME280:
         # Configure sensor with optimal settings
         self._configure_sensor()
         
-        # Wait for first measurement to complete
-        time.sleep(0.1)
+        # Verify the bus is fast enough for the per-sample read budget
+        self._check_bus_timing()
+
+    @property
+    def sea_level_pressure(self):
+        """Reference sea level pressure in hPa"""
+        return self._sea_level_pressure
+
+    @sea_level_pressure.setter
+    def sea_level_pressure(self, value):
+        # Cache the reciprocal so altitude conversion multiplies instead of dividing
+        self._sea_level_pressure = value
+        self._inv_sea_level = 1.0 / value if value > 0 else 0.0
 
-    def _soft_reset(self):
-        """Perform soft reset of the device"""
+    def _soft_reset(self, timeout_ms=50):
+        """Perform soft reset of the device and wait for the NVM copy to finish"""
         try:
-            self.i2c.writeto_mem(self.address, 0xE0, b'\xB6')
-            time.sleep(0.2)  # Wait for reset to complete
+            self.i2c.writeto_mem(self.address, _REG_RESET, b'\xB6')
+            time.sleep_ms(2)  # Datasheet start-up time
+            
+            # im_update stays set while calibration data is copied from NVM
+            start = time.ticks_ms()
+            while self._safe_read_byte(_REG_STATUS) & _STATUS_IM_UPDATE:
+                if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                    raise RuntimeError("NVM copy did not complete in time")
+                time.sleep_us(100)
         except Exception as e:
             raise RuntimeError(f"Soft reset failed: {str(e)}")
 
-    def _safe_read_byte(self, register, retries=3):
-        """Safe byte reading with error handling and retries"""
+    def _safe_read_into(self, register, buf, retries=3):
+        """Safe burst read of consecutive registers into buf with error handling and retries"""
         for attempt in range(retries):
             try:
-                return self.i2c.readfrom_mem(self.address, register, 1)[0]
+                self.i2c.readfrom_mem_into(self.address, register, buf)
+                return buf
             except Exception as e:
                 if attempt == retries - 1:
                     raise RuntimeError(f"Failed to read register 0x{register:02x}: {str(e)}")
-                time.sleep(0.1)
+                # Transient NAKs clear quickly: back off 200 us, 400 us, 800 us...
+                time.sleep_us(200 << attempt)
+
+    def _safe_read_byte(self, register, retries=3):
+        """Safe byte reading with error handling and retries"""
+        return self._safe_read_into(register, self._buf1, retries)[0]
 
     def _load_calibration(self):
         """Load sensor calibration data with comprehensive error handling"""
         try:
-            # Temperature compensation
-            self.dig_T1 = self._read_word_unsigned(0x88)
-            self.dig_T2 = self._read_word_signed(0x8A)
-            self.dig_T3 = self._read_word_signed(0x8C)
-
-            # Pressure compensation
-            self.dig_P1 = self._read_word_unsigned(0x8E)
-            self.dig_P2 = self._read_word_signed(0x90)
-            self.dig_P3 = self._read_word_signed(0x92)
-            self.dig_P4 = self._read_word_signed(0x94)
-            self.dig_P5 = self._read_word_signed(0x96)
-            self.dig_P6 = self._read_word_signed(0x98)
-            self.dig_P7 = self._read_word_signed(0x9A)
-            self.dig_P8 = self._read_word_signed(0x9C)
-            self.dig_P9 = self._read_word_signed(0x9E)
+            # Temperature and pressure compensation words live in one contiguous
+            # little-endian block (0x88-0x9F), so fetch it in a single transaction
+            buf = self._safe_read_into(_REG_CALIB, bytearray(24))
+            (self.dig_T1, self.dig_T2, self.dig_T3,
+             self.dig_P1, self.dig_P2, self.dig_P3,
+             self.dig_P4, self.dig_P5, self.dig_P6,
+             self.dig_P7, self.dig_P8, self.dig_P9) = struct.unpack('<HhhHhhhhhhhh', buf)
 
             if self.debug:
                 print("Calibration data:")
@@ -154,6 +306,21 @@ class BME280:
                 self.dig_P9 = 6000
                 print("Applied fallback pressure calibration values")
 
+            # Pack the coefficients, with invariant calibration-derived terms
+            # precomputed, into one contiguous array indexed by the _CAL_* offsets.
+            # 'f' matches the single-precision float used by MicroPython on the RP2040.
+            self._cal = array.array('f', (
+                self.dig_T1 / 1024.0, self.dig_T1 / 8192.0, self.dig_T2, self.dig_T3,
+                self.dig_P1,
+                self.dig_P1 * self.dig_P2 / 17179869184.0,
+                self.dig_P1 * self.dig_P3 / 9007199254740992.0,
+                self.dig_P4 * 16.0,
+                self.dig_P5 / 8192.0,
+                self.dig_P6 / 536870912.0,
+                self.dig_P7 / 16.0,
+                1.0 + self.dig_P8 / 524288.0,
+                self.dig_P9 / 34359738368.0))
+
             print("Calibration data loaded successfully")
         except Exception as e:
             raise RuntimeError(f"Failed to load calibration data: {str(e)}")
@@ -161,23 +328,84 @@ class BME280:
     def _configure_sensor(self):
         """Configure sensor with optimal settings for flight data"""
         try:
-            # Set the config register
-            config = 0
-            config |= 0b001 << 5  # Set standby time to 62.5ms
-            config |= 0b100 << 2  # Set filter coefficient to 16
-            self.i2c.writeto_mem(self.address, 0xF5, bytes([config]))
-
-            # Set ctrl_meas register
-            ctrl_meas = 0
-            ctrl_meas |= self.OVERSAMPLE_X2 << 5  # Temperature oversampling x2
-            ctrl_meas |= self.OVERSAMPLE_X16 << 2  # Pressure oversampling x16
-            ctrl_meas |= self.NORMAL_MODE  # Set normal mode
-            self.i2c.writeto_mem(self.address, 0xF4, bytes([ctrl_meas]))
+            self.i2c.writeto_mem(self.address, _REG_CONFIG, bytes((_CONFIG_VALUE,)))
+
+            # Forced mode takes one measurement per ctrl_meas write and then
+            # sleeps, so the sensor neither draws current nor self-heats between
+            # the samples the host actually asks for.
+            self._ctrl_meas = bytes((_CTRL_MEAS_FORCED,))
+            self.i2c.writeto_mem(self.address, _REG_CTRL_MEAS, self._ctrl_meas)
 
             print("Sensor configured for optimal data collection")
         except Exception as e:
             raise RuntimeError(f"Sensor configuration failed: {str(e)}")
 
+    def _check_bus_timing(self):
+        """Time one data burst read and warn if the bus looks slower than 400 kHz"""
+        try:
+            start = time.ticks_us()
+            self._safe_read_into(_REG_DATA, self._buf6)
+            self.i2c_read_us = time.ticks_diff(time.ticks_us(), start)
+        except Exception as e:
+            raise RuntimeError(f"Bus timing check failed: {str(e)}")
+        
+        if self.debug:
+            print(f"BME280 data burst read took {self.i2c_read_us} us")
+        if self.i2c_read_us > _FAST_MODE_READ_US:
+            print(f"WARNING: BME280 burst read took {self.i2c_read_us} us; "
+                  "use I2C(..., freq=400_000) to cut per-sample bus time")
+
+    def start_measurement(self):
+        """
+        Trigger a forced-mode conversion and return without waiting for it.
+        
+        Returns:
+            Milliseconds until the result is expected; collect it with fetch_result()
+        """
+        try:
+            self.i2c.writeto_mem(self.address, _REG_CTRL_MEAS, self._ctrl_meas)
+        except Exception:
+            self._warn(self.WARN_READ_FAILED)
+        return _MEAS_TIME_MS
+
+    def fetch_result(self):
+        """
+        Read the conversion started by start_measurement().
+        
+        Only waits if the conversion is still running, so call it once the
+        returned time has passed.
+        
+        Returns:
+            Tuple of (temperature in °C, pressure in Pa, altitude in m); any may be None.
+        """
+        try:
+            self._wait_ready()
+        except Exception:
+            self._warn(self.WARN_READ_FAILED)
+            return None, None, None
+        return self._result_tuple()
+
+    def _result_tuple(self):
+        """Read the finished conversion and add the altitude derived from it"""
+        temp, pressure = self._read_result()
+        altitude = self._altitude_from_pressure(pressure)
+        self._record_altitude(altitude)
+        return temp, pressure, altitude
+
+    def _trigger_and_wait(self, timeout_ms=100):
+        """Start a forced-mode conversion and wait until the result is ready"""
+        self.i2c.writeto_mem(self.address, _REG_CTRL_MEAS, self._ctrl_meas)
+        time.sleep_ms(_MEAS_TIME_MS)
+        self._wait_ready(timeout_ms)
+
+    def _wait_ready(self, timeout_ms=100):
+        """Poll the status register measuring bit for any remaining conversion time"""
+        start = time.ticks_ms()
+        while self._safe_read_byte(_REG_STATUS) & _STATUS_MEASURING:
+            if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                raise RuntimeError("Measurement did not complete in time")
+            time.sleep_ms(1)
+
     def calibrate_ground_level(self, samples=10, delay=0.1):
         """
         Calibrate ground level pressure and establish baseline altitude with multiple samples.
@@ -187,8 +415,8 @@ class BME280:
             delay: Delay between readings in seconds
         """
         print("Starting ground level calibration...")
-        self._ground_pressure_readings = []
-        total_altitude = 0
+        # Running sum keeps calibration O(1) in memory regardless of sample count
+        total_pressure = 0.0
         valid_samples = 0
         
         for i in range(samples):
@@ -199,16 +427,10 @@ class BME280:
                     
                     # Validate pressure reading
                     if 800 <= pressure_hpa <= 1200:  # Valid pressure range
-                        self._ground_pressure_readings.append(pressure_hpa)
-                        
-                        # Calculate absolute altitude from sea level
-                        abs_altitude = self._calculate_altitude(pressure_hpa, self.sea_level_pressure)
-                        total_altitude += abs_altitude
-                        
+                        total_pressure += pressure_hpa
                         valid_samples += 1
                         print(f"Calibration sample {valid_samples}/{samples}: "
-                              f"Pressure={pressure_hpa:.1f}hPa, "
-                              f"Abs. Altitude={abs_altitude:.1f}m")
+                              f"Pressure={pressure_hpa:.1f}hPa")
                     else:
                         print(f"Invalid pressure reading ignored: {pressure_hpa:.1f} hPa")
                 
@@ -218,10 +440,11 @@ class BME280:
         
         if valid_samples >= 3:  # At least 3 valid readings
             # Calculate average ground pressure
-            self.ground_pressure = sum(self._ground_pressure_readings) / len(self._ground_pressure_readings)
+            self.ground_pressure = total_pressure / valid_samples
             
-            # Calculate and store ground altitude offset
-            self.ground_altitude_offset = total_altitude / valid_samples
+            # Ground altitude offset is the absolute altitude of the mean pressure,
+            # which keeps it consistent with the formula used by read_altitude
+            self.ground_altitude_offset = self._calculate_altitude(self.ground_pressure, self._inv_sea_level)
             
             print(f"Ground calibration successful:")
             print(f"Ground Pressure: {self.ground_pressure:.1f} hPa")
@@ -233,237 +456,375 @@ class BME280:
             self.ground_altitude_offset = 0
             return False
 
+    def _read_raw_tp(self):
+        """
+        Burst-read the 0xF7-0xFC data registers in a single transaction.
+        
+        Reading pressure and temperature together guarantees both come from the
+        same measurement cycle, which the datasheet requires for t_fine reuse.
+        
+        Returns:
+            Tuple of (raw_temp, raw_pressure) 20-bit values
+        """
+        d = self._safe_read_into(_REG_DATA, self._buf6)
+        raw_pressure = ((d[0] << 16) | (d[1] << 8) | d[2]) >> 4
+        raw_temp = ((d[3] << 16) | (d[4] << 8) | d[5]) >> 4
+        
+        if _DEBUG and self.debug:
+            print(f"Raw data registers: {' '.join(f'{b:02x}' for b in d)}")
+            print(f"Raw temperature value: {raw_temp}, raw pressure value: {raw_pressure}")
+            
+        return raw_temp, raw_pressure
+
     def read_raw_temp(self):
         """Read raw temperature data from registers with improved error handling"""
         try:
-            # Read temperature registers with proper bit manipulation
-            msb = self._safe_read_byte(0xFA)  # Temperature MSB
-            lsb = self._safe_read_byte(0xFB)  # Temperature LSB
-            xlsb = self._safe_read_byte(0xFC)  # Temperature XLSB
-            
-            # Correct bit shifting for 20-bit temperature value
-            raw_temp = ((msb << 16) | (lsb << 8) | xlsb) >> 4
-            
-            if self.debug:
-                print(f"Raw temperature registers: MSB=0x{msb:02x}, LSB=0x{lsb:02x}, XLSB=0x{xlsb:02x}")
-                print(f"Raw temperature value: {raw_temp}")
-                
-            return raw_temp
+            return self._read_raw_tp()[0]
         except Exception as e:
             print(f"Error reading raw temperature: {str(e)}")
             return None
 
-    def read_temperature(self, debug=False):
+    def read_raw_pressure(self):
+        """Read raw pressure value from the sensor"""
+        try:
+            return self._read_raw_tp()[1]
+        except Exception as e:
+            print(f"Error reading raw pressure: {str(e)}")
+            return None
+
+    def _compensate_temperature(self, raw_temp, debug=False):
         """
-        Read temperature with enhanced accuracy and error handling.
+        Convert a raw temperature reading to degrees Celsius and update t_fine.
         
-        Args:
-            debug: If True, print detailed calibration and calculation steps
-        
-        Returns temperature in degrees Celsius.
+        Returns unrounded temperature in degrees Celsius or None if out of range.
         """
-        try:
-            raw_temp = self.read_raw_temp()
-            if raw_temp is None:
-                return None
+        fine_temp = _compensate_T(raw_temp, self._cal)
+        
+        # Store t_fine for pressure compensation
+        self.t_fine = int(fine_temp)
+        
+        # Calculate temperature
+        temp = fine_temp * 0.0001953125  # / 5120
+        
+        if _DEBUG and (debug or self.debug):
+            print(f"Raw temp: {raw_temp}")
+            print(f"t_fine: {self.t_fine}")
+            print(f"Calculated temp: {temp}°C")
 
-            # First conversion attempt using BME280 datasheet algorithm
-            var1 = ((raw_temp / 16384.0) - (self.dig_T1 / 1024.0)) * self.dig_T2
-            var2 = (((raw_temp / 131072.0) - (self.dig_T1 / 8192.0)) * 
-                   ((raw_temp / 131072.0) - (self.dig_T1 / 8192.0)) * self.dig_T3)
-            
-            # Store t_fine for pressure compensation
-            self.t_fine = int(var1 + var2)
+        # Validate temperature is within reasonable range
+        if -40 <= temp <= 85:
+            return temp
+        else:
+            # Retry with an alternative calculation method
+            self._warn(self.WARN_TEMP_RANGE, temp)
             
-            # Calculate temperature
-            temp = (var1 + var2) / 5120.0
+            # Simpler alternative calculation from the truncated t_fine
+            temp = self.t_fine * 0.0001953125
             
-            if debug or self.debug:
-                print(f"Raw temp: {raw_temp}")
-                print(f"var1: {var1}, var2: {var2}, t_fine: {self.t_fine}")
-                print(f"Calculated temp: {temp}°C")
-
-            # Validate temperature is within reasonable range
             if -40 <= temp <= 85:
-                return round(temp, 2)
+                return temp
             else:
-                # Retry with an alternative calculation method
-                print(f"Warning: Temperature {temp}°C outside valid range, trying fallback calculation")
-                
-                # Simpler alternative calculation
-                var1 = (raw_temp / 16384.0 - self.dig_T1 / 1024.0) * self.dig_T2
-                var2 = raw_temp / 131072.0 - self.dig_T1 / 8192.0
-                var2 = var2 * var2 * self.dig_T3
-                self.t_fine = int(var1 + var2)
-                temp = (self.t_fine) / 5120.0
-                
-                if -40 <= temp <= 85:
-                    print(f"Fallback temperature calculation successful: {temp}°C")
-                    return round(temp, 2)
-                else:
-                    print(f"Fallback temperature still invalid: {temp}°C")
-                    return None
-                
-        except Exception as e:
-            print(f"Temperature reading error: {str(e)}")
+                self._warn(self.WARN_TEMP_INVALID, temp)
+                return None
+
+    def _compensate_pressure(self, raw_pressure):
+        """
+        Convert a raw pressure reading to Pa using the current t_fine.
+        
+        Returns unrounded pressure in Pa or None if out of range.
+        """
+        pressure = _compensate_P(raw_pressure, self.t_fine, self._cal)
+        if pressure == 0.0:
+            return None  # Avoid division by zero
+        
+        # Validate pressure is within reasonable range
+        if 30000 <= pressure <= 120000:  # 300-1200 hPa
+            return pressure  # Return pressure in Pa
+        else:
+            self._warn(self.WARN_PRESSURE_RANGE, pressure)
             return None
 
-    def read_raw_pressure(self):
-        """Read raw pressure value from the sensor"""
+    def read_compensated(self, debug=False):
+        """
+        Read temperature and pressure from a single measurement.
+        
+        Args:
+            debug: If True, print detailed calculation steps (requires _DEBUG)
+        
+        Returns:
+            Tuple of (temperature in °C, pressure in Pa); either may be None.
+            Values are not rounded; format them where they are displayed or logged.
+        """
         try:
-            # Read pressure registers
-            msb = self._safe_read_byte(0xF7)
-            lsb = self._safe_read_byte(0xF8)
-            xlsb = self._safe_read_byte(0xF9)
-            
-            # Combine readings into a 20-bit value
-            raw_pressure = ((msb << 16) | (lsb << 8) | xlsb) >> 4
+            self._trigger_and_wait()
+        except Exception:
+            self._warn(self.WARN_READ_FAILED)
+            return None, None
+        return self._read_result(debug)
+
+    def _read_result(self, debug=False):
+        """
+        Burst-read and compensate the most recent conversion.
+        
+        Returns:
+            Tuple of (temperature in °C, pressure in Pa); either may be None.
+        """
+        try:
+            raw_temp, raw_pressure = self._read_raw_tp()
+        except Exception:
+            self._warn(self.WARN_READ_FAILED)
+            return None, None
+        
+        try:
+            temp = self._compensate_temperature(raw_temp, debug)
+        except Exception:
+            self._warn(self.WARN_TEMP_INVALID)
+            temp = None
             
-            if self.debug:
-                print(f"Raw pressure registers: MSB=0x{msb:02x}, LSB=0x{lsb:02x}, XLSB=0x{xlsb:02x}")
-                print(f"Raw pressure value: {raw_pressure}")
-                
-            return raw_pressure
-        except Exception as e:
-            print(f"Error reading raw pressure: {str(e)}")
-            return None
+        if temp is None:
+            # Use a default t_fine value if temperature read fails
+            self.t_fine = 100000  # A moderate value that should allow pressure calculation
+            self._warn(self.WARN_DEFAULT_T_FINE)
         
-    def read_pressure(self):
-        """Read pressure with high-precision compensation"""
         try:
-            # Update t_fine value - only if temperature read fails, we try with default t_fine
-            temp = self.read_temperature()
-            if temp is None:
-                # Use a default t_fine value if temperature read fails
-                self.t_fine = 100000  # A moderate value that should allow pressure calculation
-                print("Warning: Using default t_fine value for pressure calculation")
+            pressure = self._compensate_pressure(raw_pressure)
+        except Exception:
+            self._warn(self.WARN_PRESSURE_FAILED)
+            pressure = None
             
-            # Read raw pressure
-            raw_pressure = self.read_raw_pressure()
-            if raw_pressure is None:
-                return None
+        return temp, pressure
 
-            # Pressure compensation (datasheet algorithm)
-            var1 = self.t_fine / 2.0 - 64000.0
-            var2 = var1 * var1 * self.dig_P6 / 32768.0
-            var2 = var2 + var1 * self.dig_P5 * 2.0
-            var2 = var2 / 4.0 + self.dig_P4 * 65536.0
-            var1 = (self.dig_P3 * var1 * var1 / 524288.0 + self.dig_P2 * var1) / 524288.0
-            var1 = (1.0 + var1 / 32768.0) * self.dig_P1
-            
-            if var1 == 0:
-                return None  # Avoid division by zero
-            
-            pressure = 1048576.0 - raw_pressure
-            pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
-            var1 = self.dig_P9 * pressure * pressure / 2147483648.0
-            var2 = pressure * self.dig_P8 / 32768.0
-            pressure = pressure + (var1 + var2 + self.dig_P7) / 16.0
-            
-            # Validate pressure is within reasonable range
-            if 30000 <= pressure <= 120000:  # 300-1200 hPa
-                return round(pressure, 2)  # Return pressure in Pa
-            else:
-                print(f"Warning: Pressure {pressure/100:.2f} hPa outside valid range")
-                return None
-                
-        except Exception as e:
-            print(f"Pressure reading error: {str(e)}")
-            return None
+    def read_temperature(self, debug=False):
+        """
+        Read temperature with enhanced accuracy and error handling.
+        Each call triggers a full conversion; use sample() when more than one
+        value is needed, and avoid calling this in tight loops.
+        
+        Args:
+            debug: If True, print detailed calculation steps (requires _DEBUG)
+        
+        Returns temperature in degrees Celsius.
+        """
+        return self.read_compensated(debug)[0]
+
+    def read_pressure(self):
+        """
+        Read pressure with high-precision compensation.
+        Each call triggers a full conversion; use sample() when more than one
+        value is needed, and avoid calling this in tight loops.
+        """
+        return self.read_compensated()[1]
 
     def read_altitude(self):
         """
         Calculate altitude relative to calibrated ground level.
         Returns relative altitude in meters from ground calibration point.
+        Each call triggers a full conversion; use sample() when more than one
+        value is needed, and avoid calling this in tight loops.
+        """
+        return self._altitude_from_pressure(self.read_pressure())
+
+    def sample(self):
+        """
+        Take one measurement and derive every output from it.
+        
+        Returns:
+            Tuple of (temperature in °C, pressure in Pa, altitude in m); any may be None.
+            Values are not rounded; format them where they are displayed or logged.
+        """
+        temp, pressure = self.read_compensated()
+        altitude = self._altitude_from_pressure(pressure)
+        self._record_altitude(altitude)
+        return temp, pressure, altitude
+
+    def read_tuple(self):
         """
+        Read temperature, pressure and altitude from one conversion.
+        
+        Gives the same values as read_all() without building a dict.
+        
+        Returns:
+            Tuple of (temperature in °C, pressure in Pa, altitude in m); any may be None.
+        """
+        try:
+            self._trigger_and_wait()
+        except Exception:
+            self._warn(self.WARN_READ_FAILED)
+            return None, None, None
+        return self._result_tuple()
+
+    def _track_ground(self, pressure):
+        """
+        Altitude above the running ground pressure estimate.
+        
+        The first reading defines the ground. After that, every reading within
+        1 m of it nudges the estimate with an exponential moving average, so
+        slow weather drift is followed without a separate calibration phase.
+        
+        Args:
+            pressure: Current pressure in hPa
+        
+        Returns:
+            Altitude in meters relative to the ground estimate
+        """
+        if self.p_ground_ema is None:
+            self.p_ground_ema = pressure
+            self._inv_ground = 1.0 / pressure
+        
+        altitude = self._calculate_altitude(pressure, self._inv_ground)
+        if -1.0 < altitude < 1.0:
+            ema = 0.995 * self.p_ground_ema + 0.005 * pressure
+            self.p_ground_ema = ema
+            self._inv_ground = 1.0 / ema
+        return altitude
+
+    def _record_altitude(self, altitude):
+        """Store an altitude in the history ring, overwriting the oldest"""
+        if altitude is not None:
+            self._alt_history[self._alt_count & (_ALT_SLOTS - 1)] = altitude
+            self._alt_count += 1
+
+    def _altitude_from_pressure(self, pressure):
+        """Convert a pressure in Pa to altitude relative to the calibrated ground level"""
         try:
-            pressure = self.read_pressure()
             if pressure is None or pressure <= 0:
                 return None
                 
             current_pressure = pressure / 100.0  # Convert Pa to hPa
+            if self.track_ground:
+                return self._track_ground(current_pressure)
             
             # Calculate absolute altitude using current pressure
             if self.ground_pressure is None or self.ground_pressure <= 0:
                 # If not calibrated, use sea level as reference
-                absolute_altitude = self._calculate_altitude(current_pressure, self.sea_level_pressure)
+                absolute_altitude = self._calculate_altitude(current_pressure, self._inv_sea_level)
                 relative_altitude = absolute_altitude  # No offset if not calibrated
-                if self.debug:
+                if _DEBUG and self.debug:
                     print("Using uncalibrated altitude (from sea level)")
             else:
                 # Calculate altitude relative to ground pressure
-                absolute_altitude = self._calculate_altitude(current_pressure, self.sea_level_pressure)
+                absolute_altitude = self._calculate_altitude(current_pressure, self._inv_sea_level)
                 relative_altitude = absolute_altitude - self.ground_altitude_offset
                 
-            return round(relative_altitude, 2)
+            return relative_altitude
             
-        except Exception as e:
-            print(f"Altitude calculation error: {str(e)}")
+        except Exception:
+            self._warn(self.WARN_ALTITUDE_FAILED)
             return None
         
-    def _calculate_altitude(self, current_pressure, reference_pressure):
+    def _calculate_altitude(self, current_pressure, inv_reference_pressure):
         """
         Calculate altitude using the international barometric formula.
         
         Args:
             current_pressure: Current atmospheric pressure in hPa
-            reference_pressure: Reference pressure in hPa
+            inv_reference_pressure: Reciprocal of the reference pressure in 1/hPa
         
         Returns:
             Altitude in meters
         """
-        if current_pressure <= 0 or reference_pressure <= 0:
+        if current_pressure <= 0 or inv_reference_pressure <= 0:
             raise ValueError("Invalid pressure values")
+        
+        ratio = current_pressure * inv_reference_pressure
+        u = 1.0 - ratio
+        if _ALT_U_MIN <= u <= _ALT_U_MAX:
+            # Polynomial in Horner form avoids the pow() call in the flight band
+            return ((((_ALT_C5 * u + _ALT_C4) * u + _ALT_C3) * u + _ALT_C2) * u + _ALT_C1) * u
             
-        return 44330.0 * (1.0 - pow(current_pressure / reference_pressure, 0.1903))
+        return 44330.0 * (1.0 - pow(ratio, 0.1903))
+
+    def _warn(self, code, value=0.0):
+        """Record a sampling-path warning without printing or allocating"""
+        slot = self._warn_count & (_WARN_SLOTS - 1)
+        self._warn_codes[slot] = code
+        self._warn_values[slot] = value
+        self._warn_count += 1
+
+    def pop_warnings(self):
+        """
+        Return and clear the warnings recorded since the last call.
+        
+        Returns:
+            List of (code, value) tuples, oldest first. Only the most recent
+            warnings that fit in the ring buffer are kept.
+        """
+        count = min(self._warn_count, _WARN_SLOTS)
+        first = self._warn_count - count
+        warnings = [(self._warn_codes[(first + i) & (_WARN_SLOTS - 1)],
+                     self._warn_values[(first + i) & (_WARN_SLOTS - 1)])
+                    for i in range(count)]
+        self._warn_count = 0
+        return warnings
 
     def get_altitude_stats(self):
         """
         Get current altitude calculation parameters for debugging.
+        
+        Also reports the mean and standard deviation of the most recent
+        altitudes, computed in place over the history ring.
         """
+        count = min(self._alt_count, _ALT_SLOTS)
+        history = self._alt_history
+        mean = std = None
+        if count:
+            total = 0.0
+            for i in range(count):
+                total += history[i]
+            mean = total / count
+            total = 0.0
+            for i in range(count):
+                d = history[i] - mean
+                total += d * d
+            std = math.sqrt(total / count)
+        
         return {
             "ground_pressure": self.ground_pressure,
             "ground_altitude_offset": self.ground_altitude_offset,
+            "ground_pressure_ema": self.p_ground_ema,
             "sea_level_pressure": self.sea_level_pressure,
-            "t_fine": self.t_fine
+            "t_fine": self.t_fine,
+            "altitude_samples": count,
+            "altitude_mean": mean,
+            "altitude_std": std
         }
         
-    def read_all(self):
+    def read_all(self, raw=True, out=None):
         """
         Read all sensors and return values in a dictionary.
+        
+        Args:
+            raw: If False, round every value to 2 decimal places for display
+            out: Optional array('f') of length 3. If given, it is filled in place
+                with (temperature, pressure in hPa, altitude), nan for missing
+                values, and returned instead of a new dict. raw is ignored.
         """
-        temp = self.read_temperature()
-        pressure_pa = self.read_pressure()
-        altitude = self.read_altitude()
+        if out is not None:
+            temp, pressure, altitude = self.read_tuple()
+            out[0] = _NAN if temp is None else temp
+            out[1] = _NAN if pressure is None else pressure * 0.01
+            out[2] = _NAN if altitude is None else altitude
+            if self.debug:
+                self.last_diagnostics = self.get_altitude_stats()
+            return out
+        
+        temp, pressure_pa, altitude = self.sample()
         
         if pressure_pa is not None:
             pressure_hpa = pressure_pa / 100.0
         else:
             pressure_hpa = None
+        
+        if not raw:
+            if temp is not None:
+                temp = round(temp, 2)
+            if pressure_hpa is not None:
+                pressure_hpa = round(pressure_hpa, 2)
+            if altitude is not None:
+                altitude = round(altitude, 2)
             
         return {
             "temperature": temp,
             "pressure": pressure_hpa,
             "altitude": altitude
         }
-
-    def _read_word_unsigned(self, register):
-        """Read unsigned 16-bit word"""
-        try:
-            high = self._safe_read_byte(register)
-            low = self._safe_read_byte(register + 1)
-            return (high << 8) + low
-        except Exception as e:
-            print(f"Error reading unsigned word at 0x{register:02x}: {str(e)}")
-            return 0
-
-    def _read_word_signed(self, register):
-        """Read signed 16-bit word"""
-        try:
-            value = self._read_word_unsigned(register)
-            if value >= 0x8000:
-                value -= 0x10000
-            return value
-        except Exception as e:
-            print(f"Error reading signed word at 0x{register:02x}: {str(e)}")
-            return 0
\ No newline at end of file
@@ -4,29 +4,22 @@ import time
 # Passive Buzzer pin configuration
 BUZZER_PIN = 27
 
-def play_tone(pwm, frequency, duration):
+def get_duty_setter(pwm):
+    """Detect the duty cycle API once and return (set_duty, on_value) for 50% duty"""
+    if hasattr(pwm, 'duty_u16'):
+        return pwm.duty_u16, 32768  # 50% duty cycle for 16-bit
+    return pwm.duty, 512  # 50% duty cycle for 10-bit
+
+def play_tone(pwm, set_duty, frequency, duration, on_value):
     """Play a tone at a specific frequency for a given duration"""
     try:
-        # Try different methods for setting duty cycle
-        if hasattr(pwm, 'duty'):
-            pwm.freq(frequency)
-            pwm.duty(512)  # 50% duty cycle
-        elif hasattr(pwm, 'duty_u16'):
-            pwm.freq(frequency)
-            pwm.duty_u16(32768)  # 50% duty cycle for 16-bit
-        else:
-            # Fallback method using on/off
-            pwm = PWM(Pin(BUZZER_PIN), freq=frequency)
+        pwm.freq(frequency)
+        set_duty(on_value)
         
         time.sleep(duration)
         
         # Turn off the buzzer
-        if hasattr(pwm, 'duty'):
-            pwm.duty(0)
-        elif hasattr(pwm, 'duty_u16'):
-            pwm.duty_u16(0)
-        else:
-            pwm.deinit()
+        set_duty(0)
     
     except Exception as e:
         print(f"Error playing tone: {e}")
@@ -41,6 +34,7 @@ def test_passive_buzzer():
     except TypeError:
         # Some boards might require different initialization
         buzzer = PWM(Pin(BUZZER_PIN), freq=1000)
+    set_duty, on_value = get_duty_setter(buzzer)
     
     print("\n1. Frequency Sweep Test")
     # Sweep through frequencies
@@ -50,12 +44,14 @@ def test_passive_buzzer():
         (1500, 4000)  # High frequencies
     ]
     
+    # No per-step print: USB serial writes can block and skew tone timing
     for start, end in frequency_ranges:
-        print(f"\nSweeping from {start} Hz to {end} Hz")
+        steps = 0
         for freq in range(start, end, 100):
-            print(f"Testing {freq} Hz")
-            play_tone(buzzer, freq, 0.1)
-            time.sleep(0.05)
+            play_tone(buzzer, set_duty, freq, 0.1, on_value)
+            time.sleep_ms(50)
+            steps += 1
+        print(f"Swept {start}..{end} Hz in {steps} steps")
     
     print("\n2. Musical Scale Test")
     # Simple musical scale (C4 to C5)
@@ -72,7 +68,7 @@ def test_passive_buzzer():
     
     for note in notes:
         print(f"Playing note: {note} Hz")
-        play_tone(buzzer, note, 0.3)
+        play_tone(buzzer, set_duty, note, 0.3, on_value)
         time.sleep(0.1)
     
     print("\n3. Alarm Patterns")
@@ -90,13 +86,13 @@ def test_passive_buzzer():
         print(f"\nAlarm Pattern {i}")
         for freq, duration in pattern:
             print(f"Frequency: {freq} Hz, Duration: {duration}s")
-            play_tone(buzzer, freq, duration)
-            time.sleep(0.05)
+            play_tone(buzzer, set_duty, freq, duration, on_value)
+            time.sleep_ms(50)
     
     # Final test - constant tone
     print("\n4. Constant Tone Test")
     print("Steady 1000 Hz tone for 1 second")
-    play_tone(buzzer, 1000, 1)
+    play_tone(buzzer, set_duty, 1000, 1, on_value)
     
     # Cleanup
     try:
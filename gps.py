@@ -49,13 +49,16 @@ def getPositionData(gps_input):
     TIMEOUT = True
 
 
+# Minutes to degrees, as a multiply
+_INV_60 = 1.0 / 60.0
+
 # Function to convert raw latitude/longitude to degrees
 def convertToDegree(raw_value):
     try:
         raw_float = float(raw_value)
         degrees = int(raw_float / 100)  # Extract degrees
         minutes = raw_float - (degrees * 100)  # Extract minutes
-        return round(degrees + (minutes / 60.0), 6)  # Convert to decimal degrees
+        return degrees + minutes * _INV_60  # Convert to decimal degrees
     except ValueError:
         return None
 
@@ -1,52 +1,84 @@
+import array
+
+try:
+    import micropython
+    from micropython import const
+except ImportError:
+    # Host-side Python: the code emitter decorators become no-ops
+    class micropython:
+        @staticmethod
+        def viper(func):
+            return func
+    ptr32 = None
+
+    def const(value):
+        return value
+
+# Fixed-point scale factors for Q16.16 state and Q15 gain
+_Q16_ONE = const(65536)
+_Q15_ONE = const(32768)
+
+
+@micropython.viper
+def _kalman_step(state: ptr32, meas: ptr32, gain: int):
+    """
+    Apply the state correction to all three axes in fixed point
+
+    State and measurements are Q16.16, the gain is Q15. The product is split
+    into high and low halves so it never leaves 32-bit integer range.
+    """
+    for i in range(3):
+        d = meas[i] - state[i]
+        state[i] += ((gain * (d >> 16)) << 1) + ((gain * (d & 0xFFFF)) >> 15)
+
+
 class KalmanFilter3D:
     """
     3D Kalman filter implementation for sensor fusion
     Handles x, y, z measurements independently with the same filter parameters
+
+    Values are held in Q16.16 fixed point, so measurements must stay
+    within +/-32768.
     """
     def __init__(self, process_variance, measurement_variance, error_variance):
         # Initialize filter parameters for each axis
         self.process_variance = process_variance
         self.measurement_variance = measurement_variance
         self.error_variance = error_variance
-        
+
         # State variables for each axis (x, y, z)
-        self.state_estimate = [0.0, 0.0, 0.0]
-        self.error_estimate = [error_variance, error_variance, error_variance]
-        
+        self._state = array.array('i', (0, 0, 0))
+        self._meas = array.array('i', (0, 0, 0))
+        self.reset()
+
     def update(self, measurement):
         """
         Update the state estimate using a new measurement
-        
+
         Args:
-            measurement: List of [x, y, z] measurements
-            
+            measurement: Sequence of [x, y, z] measurements
+
         Returns:
-            List of filtered [x, y, z] values
+            Tuple of filtered (x, y, z) values
         """
-        filtered_values = []
-        
-        for i in range(3):  # Process each axis
-            # Prediction step
-            # State prediction (unchanged as we assume constant state between updates)
-            predicted_state = self.state_estimate[i]
-            # Error prediction
-            predicted_error = self.error_estimate[i] + self.process_variance
-            
-            # Update step
-            # Kalman gain
-            kalman_gain = predicted_error / (predicted_error + self.measurement_variance)
-            
-            # State update
-            self.state_estimate[i] = predicted_state + kalman_gain * (measurement[i] - predicted_state)
-            
-            # Error update
-            self.error_estimate[i] = (1 - kalman_gain) * predicted_error
-            
-            filtered_values.append(self.state_estimate[i])
-            
-        return filtered_values
-    
+        # The error estimate never depends on the measurements, so it is the
+        # same on every axis and the gain only has to be computed once
+        p = self._error + self.process_variance
+        k = p / (p + self.measurement_variance)
+        self._error = (1 - k) * p
+
+        meas = self._meas
+        meas[0] = int(measurement[0] * _Q16_ONE)
+        meas[1] = int(measurement[1] * _Q16_ONE)
+        meas[2] = int(measurement[2] * _Q16_ONE)
+
+        state = self._state
+        _kalman_step(state, meas, int(k * _Q15_ONE))
+
+        return (state[0] / _Q16_ONE, state[1] / _Q16_ONE, state[2] / _Q16_ONE)
+
     def reset(self):
         """Reset the filter to initial conditions"""
-        self.state_estimate = [0.0, 0.0, 0.0]
-        self.error_estimate = [self.error_variance, self.error_variance, self.error_variance]
\ No newline at end of file
+        state = self._state
+        state[0] = state[1] = state[2] = 0
+        self._error = self.error_variance
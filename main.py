@@ -1,20 +1,26 @@
-import machine
-from machine import Pin, I2C, SPI,PWM
+from machine import Pin, I2C, PWM, Timer
+import array
+import json
+import struct
 import time
 from time import sleep
-import math
-import os
 try:
-    import sdcard
-    import json
+    import _thread
 except ImportError:
-    pass
+    _thread = None
+try:
+    import micropython
+except ImportError:
+    # Host-side Python: the code emitter decorators become no-ops
+    class micropython:
+        @staticmethod
+        def native(func):
+            return func
 
 try:
     from mpu6050 import MPU6050
     from bme280 import BME280
     from neo6m import NEO6M
-    from kalman import KalmanFilter3D
     CUSTOM_MODULES_AVAILABLE = True
 except ImportError:
     CUSTOM_MODULES_AVAILABLE = False
@@ -45,6 +51,57 @@ PIN_CONFIG = {
     },
     'BUZZER' :27
 }
+
+# Records are gathered in RAM and written to the SD card in blocks of this size
+DATA_BUFFER_SIZE = 4096
+FLIGHT_SEQ_FILE = "flight_seq.txt"
+# Samples are logged as fixed-size little-endian binary records; the field
+# list and format are written to a JSON header next to the data file
+DATA_FIELDS = ("timestamp", "temperature", "pressure", "altitude", "ax", "ay", "az",
+               "gx", "gy", "gz", "latitude", "longitude")
+DATA_FORMAT = "<Ifffffffffff"
+RECORD_SIZE = struct.calcsize(DATA_FORMAT)
+
+# Rows handed from the sampling loop to the SD writer on core1
+RING_SLOTS = 64
+
+# Button timing: presses closer together than the debounce are ignored,
+# holding for HOLD_MS requests shutdown
+BUTTON_DEBOUNCE_MS = 500
+BUTTON_HOLD_MS = 3000
+
+# Echo one in this many saved samples to the terminal in verbose mode
+ECHO_EVERY = 10
+
+# MPU6050 FIFO sample rate divider: 8 kHz / (1 + 79) = 100 Hz, about ten
+# samples per main-loop tick and well inside the 85-sample FIFO
+MPU_FIFO_DIV = 79
+
+# Altitude history used for trend analysis, and the tail used for landing stability
+ALT_WINDOW = 10
+ALT_STABLE_WINDOW = 5
+
+
+# Samples held in RAM between saves when the core1 writer is not running
+SAMPLE_SLOTS = 64
+
+_NAN = float('nan')
+
+# Log levels; messages below the CanSat's minimum level are never formatted
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "FATAL": 50}
+# Recent log lines are kept in a byte ring of this size for post-mortem dumps
+DEBUG_BUFFER_SIZE = 4096
+DEBUG_DUMP_FILE = "error_log.txt"
+
+
+class _NoLock:
+    """Stand-in for a thread lock when _thread is not available"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
 class FlightStates:
     WAITING_START = -1
     IDLE = 0
@@ -56,39 +113,104 @@ class FlightStates:
     LANDED = 6
     SHUTDOWN = 7
 
+    # Indexed by state + 1
+    _STATE_NAMES = ("WAITING_START", "IDLE", "PREFLIGHT", "CALIBRATION",
+                    "READY", "ASCENT", "DESCENT", "LANDED", "SHUTDOWN")
+
     @staticmethod
     def get_state_name(state):
-        states = {
-            -1: "WAITING_START",
-            0: "IDLE",
-            1: "PREFLIGHT",
-            2: "CALIBRATION",
-            3: "READY",
-            4: "ASCENT",
-            5: "DESCENT",
-            6: "LANDED",
-            7: "SHUTDOWN"
-        }
-        return states.get(state, "UNKNOWN")
+        if -1 <= state <= 7:
+            return FlightStates._STATE_NAMES[state + 1]
+        return "UNKNOWN"
 
 class CanSat:
-    def __init__(self):
-        self._debug_messages = []
-        self.state = FlightStates.WAITING_START
-        self.data_buffer = []
-        self.last_save_time = time.time()
-        self.save_interval = 5
+    def __init__(self, verbose=False, log_level="INFO"):
+        self._min_level = LOG_LEVELS[log_level]
+        self._init_logging()
+        self._set_state(FlightStates.WAITING_START)
+        self.led_red = None
+        self.led_green = None
+        self._blink_timer = Timer()
+        # LED currently driven by _blink_pattern; _update_leds leaves it alone
+        self._blink_led = None
+        self._blink_steps = []
+        self._blink_cb = self._blink_step
+        self._led_state = None
+        self._led_phase = False
+        self._led_next_ms = time.ticks_ms()
+        
+        # Sensor health flags read on every sample; self.status keeps the error details
+        self.mpu_ok = False
+        self.bme_ok = False
+        self.gps_ok = False
+        
+        # Struct-of-arrays sample buffer, one array per logged field
+        self.buf_ts = array.array('L', [0] * SAMPLE_SLOTS)
+        self.buf_temp = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_pressure = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_altitude = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_ax = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_ay = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_az = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_gx = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_gy = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_gz = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_lat = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self.buf_lon = array.array('f', [0.0] * SAMPLE_SLOTS)
+        self._buf_idx = 0
+        self.last_save_time = time.ticks_ms()
+        self.save_interval_ms = 5000
         self.current_file = None
+        self._data_fh = None
+        self._write_buf = bytearray(DATA_BUFFER_SIZE)
+        self._write_mv = memoryview(self._write_buf)
+        self._write_len = 0
+        self._ring = [bytearray(RECORD_SIZE) for _ in range(RING_SLOTS)]
+        self._ring_idx = array.array('I', [0, 0])  # head (core0), tail (core1)
+        self._ring_dropped = 0
+        self._writer_running = False
+        # Words shared with core1: flush requests (core0), flushes done
+        # (core1) and stop (core0); single-word stores are atomic
+        self._writer_ctl = array.array('I', [0, 0, 0])
+        self._writer_error = None
+        # The VFS and SD driver are not thread-safe, so every file access on
+        # either core goes through this lock
+        self._fs_lock = _thread.allocate_lock() if _thread is not None else _NoLock()
         self.event_file = None
-        self.last_altitude = None
+        self._event_fh = None
+        # Missing readings are nan rather than None so every field stays a float
+        self._cached_altitude = _NAN
+        self.last_altitude = _NAN
         self.descent_detected = False
+        self.descent_confidence = 0
+        self.landing_confidence = 0
+        self._consecutive_low_readings = 0
+        self._reset_altitude_history()
         self.baseline_pressure = None
         self.initial_altitude = 0
+        # BME280 conversions are started at the end of one sample and read at
+        # the start of the next; the start times give the real sample spacing
+        self._bme_pending = False
+        self._bme_start_ms = 0
+        self._last_alt_ms = None
+        self._verbose = verbose
+        self._echo_count = 0
+        
+        # Button state is updated from the pin IRQ; the main loop only reads the flags
+        self._hold_timer = Timer()
+        self._button_down = False
+        self._button_pending = False
+        self._hold_fired = False
+        self._last_button_press = time.ticks_add(time.ticks_ms(), -BUTTON_DEBOUNCE_MS)
+        # Bound once so the ISR does not allocate
+        self._button_edge_cb = self._on_button_edge
+        self._hold_cb = self._on_button_hold
         
         try:
             self.led_red = Pin(PIN_CONFIG['LED']['RED'], Pin.OUT)
             self.led_green = Pin(PIN_CONFIG['LED']['GREEN'], Pin.OUT)
             self.button = Pin(PIN_CONFIG['BUTTON'], Pin.IN, Pin.PULL_UP)
+            self.button.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=self._button_isr)
             
             self.led_red.off()
             self.led_green.off()
@@ -115,16 +237,43 @@ class CanSat:
         
         self._init_data_storage()
 
+    def _next_flight_id(self):
+        """
+        Increment and persist the flight counter
+        
+        The RTC is not set on a cold boot, so time-based filenames can repeat
+        between power cycles and overwrite earlier flights.
+        
+        Returns:
+            Sequence number for this flight
+        """
+        try:
+            with open(FLIGHT_SEQ_FILE) as f:
+                n = int(f.read())
+        except (OSError, ValueError):
+            n = 0
+        n += 1
+        with open(FLIGHT_SEQ_FILE, 'w') as f:
+            f.write(str(n))
+        return n
+
     def _init_data_storage(self):
         try:
-            timestamp = time.time()
-            self.current_file = f"data_{timestamp}.csv"
-            with open(self.current_file, 'w') as f:
-                f.write("timestamp,temperature,pressure,altitude,ax,ay,az,gx,gy,gz,latitude,longitude\n")
+            flight_id = self._next_flight_id()
+            self.current_file = f"data_{flight_id:04d}.bin"
+            with open(f"data_{flight_id:04d}.json", 'w') as f:
+                json.dump({"format": DATA_FORMAT, "record_size": RECORD_SIZE,
+                           "fields": DATA_FIELDS}, f)
+            
+            # Kept open for the whole flight so each save is a single block write
+            self._data_fh = open(self.current_file, 'ab')
             
-            self.event_file = f"events_{timestamp}.csv"
-            with open(self.event_file, 'w') as f:
-                f.write("timestamp,event,state,altitude,details\n")
+            self.event_file = f"events_{flight_id:04d}.csv"
+            self._event_fh = open(self.event_file, 'a')
+            self._event_fh.write("timestamp,event,state,altitude,details\n")
+            
+            # Started last, so core1 never shares the card with the setup above
+            self._start_writer()
             
             self._log(f"Created data files: {self.current_file} and {self.event_file}")
             self._log_event("System Initialization", "System startup completed")
@@ -133,25 +282,34 @@ class CanSat:
             self._log(f"Error creating data files: {str(e)}", "ERROR")
             self._fatal_error(f"Could not initialize data storage: {str(e)}")
 
-    def _log_event(self, event, details=""):
-        """Log flight events with current sensor data"""
+    def _set_state(self, state):
+        """Change flight state, caching its name for logging"""
+        self.state = state
+        self._state_name = FlightStates.get_state_name(state)
+
+    def _log_event(self, event, details="", flush=False):
+        """
+        Log flight events with current sensor data
+        
+        Args:
+            event: Event name
+            details: Free-text details
+            flush: Sync the event file to the card, for state transitions
+        """
         try:
-            if self.event_file:
+            if self._event_fh:
                 timestamp = time.time()
-                state_name = FlightStates.get_state_name(self.state)
-                altitude = "None"
+                state_name = self._state_name
                 
-                # Try to get current altitude if BME is working
-                if self.status["bme"]["working"]:
-                    try:
-                        altitude = str(self.bme.read_altitude())
-                    except:
-                        pass
+                # Altitude of the latest sample, rather than a fresh I2C read
+                line = f"{timestamp},{event},{state_name},{self._cached_altitude},{details}\n"
+                with self._fs_lock:
+                    self._event_fh.write(line)
+                    if flush:
+                        self._event_fh.flush()
                 
-                with open(self.event_file, 'a') as f:
-                    f.write(f"{timestamp},{event},{state_name},{altitude},{details}\n")
-                
-                self._log(f"Event logged: {event} - {details}")
+                # The row is already in the event file; the echo is only for debugging
+                self._log(lambda: f"Event logged: {event} - {details}", "DEBUG")
         except Exception as e:
             self._log(f"Error logging event: {str(e)}", "ERROR")
             
@@ -237,6 +395,7 @@ class CanSat:
                 self.initial_altitude = self.bme.ground_altitude
                 
                 self.status["bme"]["working"] = True
+                self.bme_ok = True
                 
                 self._log(f"Ground zero pressure calibrated: {self.baseline_pressure} hPa")
                 self._log(f"Initial ground altitude set to: {self.initial_altitude} m")
@@ -247,7 +406,10 @@ class CanSat:
             # Initialize MPU6050
             try:
                 self.mpu = MPU6050(self.i2c0)
+                # The MPU samples on its own clock; each tick drains and averages the FIFO
+                self.mpu.enable_fifo(MPU_FIFO_DIV)
                 self.status["mpu"]["working"] = True
+                self.mpu_ok = True
                 self._log("MPU6050 initialized")
             except Exception as e:
                 self.status["mpu"]["error"] = str(e)
@@ -255,14 +417,15 @@ class CanSat:
 
             # Initialize GPS
             try:
-                self.gps = NEO6M(uart_id=1, tx_pin=PIN_CONFIG['GPS']['TX'], rx_pin=PIN_CONFIG['GPS']['RX'])
+                self.gps = NEO6M(uart_id=1, tx_pin=PIN_CONFIG['GPS']['TX'], rx_pin=PIN_CONFIG['GPS']['RX'], ubx=True)
                 self.status["gps"]["working"] = True
+                self.gps_ok = True
                 self._log("GPS initialized")
             except Exception as e:
                 self.status["gps"]["error"] = str(e)
                 self._log(f"GPS error: {str(e)}", "ERROR")
 
-            if self.status["mpu"]["working"] and self.status["bme"]["working"]:
+            if self.mpu_ok and self.bme_ok:
                 self.status["system_ready"] = True
                 self._event_buzzer_patterns("SENSORS_READY")
                 self._log("System ready with minimum required sensors")
@@ -275,72 +438,83 @@ class CanSat:
             return False
 
     def _collect_sensor_data(self):
-        """Collect and format sensor data with improved error handling"""
-        data = {
-            "timestamp": time.time(),
-            "temperature": None,
-            "pressure": None,
-            "altitude": None,
-            "ax": None, "ay": None, "az": None,
-            "gx": None, "gy": None, "gz": None,
-            "latitude": None, "longitude": None,
-            "vertical_velocity": None
-        }
+        """
+        Collect one sample into the next slot of the sample buffer
+        
+        Fields without a reading are stored as nan.
+        
+        Returns:
+            Index of the slot that was filled
+        """
+        i = self._buf_idx
+        mpu_ok = self.mpu_ok
+        bme_ok = self.bme_ok
+        gps_ok = self.gps_ok
+        
+        self.buf_ts[i] = int(time.time())
+        self.buf_temp[i] = _NAN
+        self.buf_pressure[i] = _NAN
+        self.buf_altitude[i] = _NAN
+        self.buf_ax[i] = self.buf_ay[i] = self.buf_az[i] = _NAN
+        self.buf_gx[i] = self.buf_gy[i] = self.buf_gz[i] = _NAN
+        self.buf_lat[i] = self.buf_lon[i] = _NAN
+        self._buf_idx = i + 1
         
         try:
-            if self.status["mpu"]["working"]:
-                accel = self.mpu.get_acceleration()
-                gyro = self.mpu.get_rotation()
-                data.update({
-                    "ax": accel[0], "ay": accel[1], "az": accel[2],
-                    "gx": gyro[0], "gy": gyro[1], "gz": gyro[2]
-                })
+            az = peak_az = _NAN
+            if mpu_ok:
+                # The batch mean is logged; its largest |az| is kept for impact
+                # detection. An empty FIFO (or one just reset after an overflow)
+                # falls back to a direct register read.
+                motion = self.mpu.read_fifo_mean()
+                if motion is None:
+                    ax, ay, az, gx, gy, gz = self.mpu.get_motion6()
+                    peak_az = az
+                else:
+                    ax, ay, az, gx, gy, gz, peak_az = motion
+                self.buf_ax[i], self.buf_ay[i], self.buf_az[i] = ax, ay, az
+                self.buf_gx[i], self.buf_gy[i], self.buf_gz[i] = gx, gy, gz
             
-                try:
-                    if self.status["mpu"]["working"]:
-                        accel = self.mpu.get_acceleration()
-                        gyro = self.mpu.get_rotation()
-                        data.update({
-                            "ax": accel[0], "ay": accel[1], "az": accel[2],
-                            "gx": gyro[0], "gy": gyro[1], "gz": gyro[2]
-                        })
-                    
-                    if self.status["bme"]["working"]:
-                        data["temperature"] = self.bme.read_temperature()
-                        data["pressure"] = self.bme.read_pressure() / 100.0  # Convert to hPa
-                        altitude = self.bme.read_altitude()
-                        
-                        if altitude is not None:
-                            data["altitude"] = round(altitude, 2)
-                            # Calculate vertical velocity if we have previous altitude
-                            if hasattr(self, 'last_altitude') and self.last_altitude is not None:
-                                data["vertical_velocity"] = (altitude - self.last_altitude) / 0.1  # Assuming 10Hz
-                            self._check_flight_events(data["altitude"])
-                    
-                    if self.status["gps"]["working"]:
-                        pos = self.gps.get_position()
-                        if pos:
-                            data.update({
-                                "latitude": pos[0],
-                                "longitude": pos[1]
-                            })
-                            
-                except Exception as e:
-                    self._log(f"Error collecting sensor data: {str(e)}", "ERROR")
-
+            if bme_ok:
+                # One conversion for all three values; pressure is logged in hPa.
+                # The conversion started last sample has finished by now, so
+                # only the first sample waits for one.
+                bme = self.bme
+                if self._bme_pending:
+                    sample_ms = self._bme_start_ms
+                    temp, pressure, altitude = bme.fetch_result()
+                else:
+                    sample_ms = time.ticks_ms()
+                    temp, pressure, altitude = bme.read_tuple()
+                self._bme_start_ms = time.ticks_ms()
+                bme.start_measurement()
+                self._bme_pending = True
+                
+                if temp is not None:
+                    self.buf_temp[i] = temp
+                if pressure is not None:
+                    self.buf_pressure[i] = pressure * 0.01
+                
+                if altitude is not None:
+                    altitude = round(altitude, 2)
+                    self.buf_altitude[i] = altitude
+                    self._cached_altitude = altitude
+                    last_ms = self._last_alt_ms
+                    time_delta = 0.1 if last_ms is None else time.ticks_diff(sample_ms, last_ms) * 0.001
+                    self._last_alt_ms = sample_ms
+                    self._check_flight_events(altitude, az, peak_az, time_delta)
             
-            if self.status["gps"]["working"]:
-                pos = self.gps.get_position()
+            if gps_ok:
+                gps = self.gps
+                gps.update()
+                pos = gps.get_position()
                 if pos:
-                    data.update({
-                        "latitude": pos[0],
-                        "longitude": pos[1]
-                    })
+                    self.buf_lat[i], self.buf_lon[i] = pos[0], pos[1]
                     
         except Exception as e:
             self._log(f"Error collecting sensor data: {str(e)}", "ERROR")
         
-        return data
+        return i
 
     def _get_timestamp(self):
         """Create a formatted timestamp string"""
@@ -350,18 +524,59 @@ class CanSat:
         )
 
     def _log(self, message, level="INFO"):
-        """Log messages with timestamp and level"""
+        """
+        Log messages with timestamp and level
+        
+        Args:
+            message: Message string, or a callable returning one so that
+                     filtered messages are never formatted
+            level: One of LOG_LEVELS
+        """
+        if LOG_LEVELS[level] < self._min_level:
+            return
+        if callable(message):
+            message = message()
+        
         # Use simple timestamp since MicroPython time doesn't have strftime
         timestamp = time.time()
         log_message = f"[{timestamp}] {level}: {message}"
         print(log_message)
-        self._debug_messages.append(log_message)
+        self._record_debug(log_message.encode())
+        self._record_debug(b"\n")
+
+    def _record_debug(self, entry):
+        """Copy bytes into the debug ring, wrapping over the oldest entries"""
+        size = DEBUG_BUFFER_SIZE
+        n = len(entry)
+        if n > size:
+            entry = entry[n - size:]
+            n = size
+        
+        off = self._dbg_off
+        first = min(n, size - off)
+        self._dbg_buf[off:off + first] = entry[:first]
+        if first < n:
+            self._dbg_buf[:n - first] = entry[first:]
+        if off + n >= size:
+            self._dbg_wrapped = True
+        self._dbg_off = (off + n) % size
+
+    def dump_debug(self, path=DEBUG_DUMP_FILE):
+        """Append the debug ring to a file, oldest entry first"""
+        try:
+            with self._fs_lock, open(path, 'ab') as f:
+                if self._dbg_wrapped:
+                    f.write(self._dbg_mv[self._dbg_off:])
+                f.write(self._dbg_mv[:self._dbg_off])
+        except Exception as e:
+            print(f"Could not dump debug log: {str(e)}")
 
     def _fatal_error(self, message):
         """Handle fatal errors"""
         self._event_buzzer_patterns("ERROR")
         self._log(message, "FATAL")
-        if hasattr(self, 'led_red'):
+        self.dump_debug()
+        if self.led_red is not None:
             try:
                 self.led_red.on()
             except:
@@ -369,105 +584,211 @@ class CanSat:
         raise RuntimeError(message)
     def _init_logging(self):
         """Initialize logging system"""
-        self._debug_messages = [];
+        self._dbg_buf = bytearray(DEBUG_BUFFER_SIZE)
+        self._dbg_mv = memoryview(self._dbg_buf)
+        self._dbg_off = 0
+        self._dbg_wrapped = False
     
     def _safe_shutdown(self):
         """Safely shutdown the system"""
         self._event_buzzer_patterns("SHUTDOWN")
         self._log("Initiating safe shutdown")
-        self._log_event("Shutdown", "System shutdown initiated")
+        self._log_event("Shutdown", "System shutdown initiated", flush=True)
         
         # Save any remaining buffered data
-        if self.data_buffer:
-            for data in self.data_buffer:
-                self._save_data(data)
-            self.data_buffer = []
+        self._save_samples()
+        
+        # The data file can only be closed once core1 has let go of it
+        if self._stop_writer():
+            self._flush_data()
+            if self._data_fh:
+                try:
+                    with self._fs_lock:
+                        self._data_fh.close()
+                except Exception as e:
+                    self._log(f"Error closing data file: {str(e)}", "ERROR")
+                self._data_fh = None
+        else:
+            self._log("SD writer still running, data file left open", "ERROR")
+        if self._event_fh:
+            try:
+                with self._fs_lock:
+                    self._event_fh.close()
+            except Exception as e:
+                self._log(f"Error closing event file: {str(e)}", "ERROR")
+            self._event_fh = None
+        
+        # Stop button handling
+        try:
+            self.button.irq(handler=None)
+        except Exception:
+            pass
+        self._hold_timer.deinit()
+        self._blink_timer.deinit()
+        self._blink_led = None
         
         # Turn off LEDs
-        if hasattr(self, 'led_red'):
+        if self.led_red is not None:
             self.led_red.off()
-        if hasattr(self, 'led_green'):
+        if self.led_green is not None:
             self.led_green.off()
         
-        self.state = FlightStates.SHUTDOWN
+        self._set_state(FlightStates.SHUTDOWN)
         
     def _blink_pattern(self, led, pattern):
-        """Blink LED in specified pattern"""
-        for duration in pattern:
-            led.toggle()
-            sleep(duration)
+        """
+        Blink LED in specified pattern without blocking
+        
+        Each duration in seconds is timed by a one-shot timer that toggles the
+        LED and arms itself for the next step; the LED is left off at the end.
+        While the pattern runs the LED is owned by it, and a pattern that is
+        still running is cut short (its LED turned off) by a new one.
+        """
+        self._blink_timer.deinit()
+        if self._blink_led is not None:
+            self._blink_led.off()
+        
+        self._blink_led = led
+        self._blink_steps = list(pattern)
         led.off()
+        self._blink_step()
+
+    def _blink_step(self, timer=None):
+        """Advance the running blink pattern by one step"""
+        led = self._blink_led
+        if led is None:
+            return
+        if self._blink_steps:
+            led.toggle()
+            self._blink_timer.init(mode=Timer.ONE_SHOT, period=int(self._blink_steps.pop(0) * 1000),
+                                   callback=self._blink_cb)
+        else:
+            led.off()
+            self._blink_led = None
+        
+    def _reset_altitude_history(self):
+        """Clear the altitude ring buffer and its running statistics"""
+        self._alt_ring = array.array('f', [0] * ALT_WINDOW)
+        self._alt_head = 0
+        self._alt_count = 0
+        self._alt_sum5 = 0.0
+        self._alt_sumsq5 = 0.0
+        self._down_count = 0
+
+    @micropython.native
+    def _push_altitude(self, altitude):
+        """
+        Add an altitude to the ring buffer, updating the running statistics
         
-    def _check_flight_events(self, current_altitude):
+        Only the samples entering and leaving each window are touched, so the
+        cost per tick does not depend on the window size. The last-5 sums are
+        rebuilt from the ring once per lap to stop float drift accumulating.
+        """
+        ring = self._alt_ring
+        head = self._alt_head
+        count = self._alt_count
+        
+        # Downward steps between consecutive readings across the whole window
+        if count and ring[head - 1] > altitude:
+            self._down_count += 1
+        if count == ALT_WINDOW and ring[head] > ring[(head + 1) % ALT_WINDOW]:
+            self._down_count -= 1
+        
+        if count >= ALT_STABLE_WINDOW:
+            old = ring[head - ALT_STABLE_WINDOW]
+            self._alt_sum5 -= old
+            self._alt_sumsq5 -= old * old
+        
+        ring[head] = altitude
+        altitude = ring[head]
+        self._alt_sum5 += altitude
+        self._alt_sumsq5 += altitude * altitude
+        
+        head = (head + 1) % ALT_WINDOW
+        self._alt_head = head
+        if count < ALT_WINDOW:
+            self._alt_count = count + 1
+        
+        if head == 0:
+            total = 0.0
+            total_sq = 0.0
+            for i in range(ALT_WINDOW - ALT_STABLE_WINDOW, ALT_WINDOW):
+                total += ring[i]
+                total_sq += ring[i] * ring[i]
+            self._alt_sum5 = total
+            self._alt_sumsq5 = total_sq
+
+    @micropython.native
+    def _check_flight_events(self, current_altitude, vertical_acceleration=_NAN,
+                             peak_acceleration=_NAN, time_delta=0.1):
         """
         Enhanced flight events detection using altitude changes and acceleration data
         Detects: Apogee, Descent initiation, and Landing impact
+        
+        Args:
+            current_altitude: Altitude of this sample in metres
+            vertical_acceleration: Z-axis acceleration of this sample in g, or nan
+            peak_acceleration: Largest-magnitude Z-axis acceleration since the
+                               previous sample in g, or nan; used for impact
+            time_delta: Seconds since the previous altitude sample
         """
-        if self.last_altitude is None:
+        # nan is the only value not equal to itself
+        if self.last_altitude != self.last_altitude:
             self.last_altitude = current_altitude
-            self.altitude_history = []  # Keep last 10 readings for trend analysis
+            self._reset_altitude_history()
             self.descent_confidence = 0
             self.landing_confidence = 0
             return
 
         # Keep a rolling window of altitude measurements
-        self.altitude_history.append(current_altitude)
-        if len(self.altitude_history) > 10:
-            self.altitude_history.pop(0)
+        self._push_altitude(current_altitude)
+        history_len = self._alt_count
 
-        # Calculate vertical velocity (m/s) and acceleration
-        time_delta = 0.1  # Assuming 10Hz sampling rate
+        # Calculate vertical velocity (m/s) from the measured sample spacing
+        if time_delta <= 0:
+            time_delta = 0.1
         velocity = (current_altitude - self.last_altitude) / time_delta
-        
-        # Get acceleration data if available
-        vertical_acceleration = None
-        if self.status["mpu"]["working"]:
-            try:
-                accel = self.mpu.get_acceleration()
-                vertical_acceleration = accel[2]  # Z-axis acceleration
-            except:
-                pass
 
         # Apogee and Descent Detection
         if self.state == FlightStates.ASCENT and not self.descent_detected:
             # Calculate altitude trend over last 10 readings
-            if len(self.altitude_history) >= 5:
-                recent_trend = sum(1 for i in range(len(self.altitude_history)-1) 
-                                if self.altitude_history[i] > self.altitude_history[i+1])
-                
+            if history_len >= 5:
                 # Check for consistent downward trend
-                if recent_trend >= 4:  # 4 out of 5 readings showing descent
+                if self._down_count >= 4:  # 4 out of 5 readings showing descent
                     self.descent_confidence += 1
                 else:
                     self.descent_confidence = max(0, self.descent_confidence - 1)
 
                 # Confirm descent with multiple indicators
                 if (velocity < -1.0 and self.descent_confidence >= 3) or \
-                (vertical_acceleration is not None and vertical_acceleration < -0.5):
+                (vertical_acceleration == vertical_acceleration and vertical_acceleration < -0.5):
                     self._event_buzzer_patterns("APOGEE")
-                    self.state = FlightStates.DESCENT
+                    self._set_state(FlightStates.DESCENT)
                     self.descent_detected = True
-                    max_altitude = max(self.altitude_history)
+                    max_altitude = max(self._alt_ring[:history_len])
                     self._log_event("Apogee Detected", 
-                                f"Max altitude: {max_altitude}m, Velocity: {velocity:.2f}m/s")
+                                f"Max altitude: {max_altitude}m, Velocity: {velocity:.2f}m/s", flush=True)
+                    self._flush_data()
 
         # Landing Detection
         elif self.state == FlightStates.DESCENT:
             if current_altitude < 4:  # Below 4 meters
                 # Check for impact using acceleration if available
-                if vertical_acceleration is not None:
-                    if abs(vertical_acceleration) > 3.0:  # Strong impact detected
+                if peak_acceleration == peak_acceleration:
+                    if abs(peak_acceleration) > 3.0:  # Strong impact detected
                         self._event_buzzer_patterns("LANDING")
-                        self.state = FlightStates.LANDED
+                        self._set_state(FlightStates.LANDED)
                         self._log_event("Impact Detected", 
-                                    f"Final altitude: {current_altitude}m, Impact acceleration: {vertical_acceleration}g")
+                                    f"Final altitude: {current_altitude}m, Impact acceleration: {peak_acceleration}g",
+                                    flush=True)
+                        self._flush_data()
                         return
 
                 # Backup method: check for stable low altitude
                 altitude_variance = 0
-                if len(self.altitude_history) >= 5:
-                    mean_alt = sum(self.altitude_history[-5:]) / 5
-                    altitude_variance = sum((x - mean_alt) ** 2 for x in self.altitude_history[-5:]) / 5
+                if history_len >= ALT_STABLE_WINDOW:
+                    mean_alt = self._alt_sum5 / ALT_STABLE_WINDOW
+                    altitude_variance = self._alt_sumsq5 / ALT_STABLE_WINDOW - mean_alt * mean_alt
 
                 if altitude_variance < 0.25 and velocity > -0.5:  # Very stable altitude
                     self.landing_confidence += 1
@@ -475,37 +796,187 @@ class CanSat:
                     self.landing_confidence = max(0, self.landing_confidence - 1)
 
                 if self.landing_confidence >= 5:  # Require 5 consecutive stable readings
-                    self.state = FlightStates.LANDED
+                    self._set_state(FlightStates.LANDED)
                     self._log_event("Landing Detected", 
-                                f"Final altitude: {current_altitude}m, Velocity: {velocity:.2f}m/s")
+                                f"Final altitude: {current_altitude}m, Velocity: {velocity:.2f}m/s", flush=True)
+                    self._flush_data()
 
         self.last_altitude = current_altitude
 
-    def _save_data(self, data):
-        """Save data to local storage with improved error handling"""
-        if not self.current_file:
+    def _start_writer(self):
+        """Start the SD writer on core1, falling back to writing from the main loop"""
+        if _thread is None:
+            self._log("Threads not available, writing data from main loop")
             return
         
         try:
-            # Format data as CSV row
-            row = (f"{data['timestamp']},{data['temperature']},{data['pressure']},"
-                  f"{data['altitude']},{data['ax']},{data['ay']},{data['az']},"
-                  f"{data['gx']},{data['gy']},{data['gz']},{data['latitude']},"
-                  f"{data['longitude']}\n")
-            
-            # Append to file
-            with open(self.current_file, 'a') as f:
-                f.write(row)
+            self._writer_running = True
+            _thread.start_new_thread(self._writer_loop, ())
+            self._log("SD writer started on core1")
+        except Exception as e:
+            self._writer_running = False
+            self._log(f"Could not start SD writer: {str(e)}", "ERROR")
+
+    def _stop_writer(self, timeout_ms=2000):
+        """
+        Ask the SD writer to drain the ring and wait for it to exit
+        
+        Returns:
+            True once core1 no longer touches the data file
+        """
+        if not self._writer_running:
+            self._check_writer()
+            return True
+        
+        self._writer_ctl[2] = 1
+        start = time.ticks_ms()
+        while self._writer_running:
+            if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                self._log("SD writer did not stop in time", "ERROR")
+                return False
+            time.sleep_ms(5)
+        self._check_writer()
+        return True
+
+    def _check_writer(self):
+        """Log an error reported by the SD writer; core1 never prints itself"""
+        if self._writer_error is not None:
+            self._log(f"SD writer error: {self._writer_error}", "ERROR")
+            self._writer_error = None
+
+    def _writer_loop(self):
+        """
+        Core1 consumer: move queued rows into the block buffer
+        
+        Only this loop touches the block buffer and the file while it runs.
+        Core0 requests a flush or a stop through _writer_ctl, which is acted
+        on once the ring is empty. Errors are left in _writer_error for
+        core0 to log, so console output stays on core0.
+        """
+        idx = self._ring_idx
+        ctl = self._writer_ctl
+        ring = self._ring
+        
+        try:
+            while True:
+                tail = idx[1]
+                requested = ctl[0]
+                if tail != idx[0]:
+                    self._buffer_record(ring[tail])
+                    idx[1] = (tail + 1) % RING_SLOTS
+                elif requested != ctl[1]:
+                    self._write_block()
+                    ctl[1] = requested
+                elif ctl[2]:
+                    break
+                else:
+                    time.sleep_ms(2)
+        except Exception as e:
+            self._writer_error = str(e)
+        finally:
+            self._writer_running = False
+
+    def _queue_record(self, i):
+        """Pack sample slot i into the SD writer ring, dropping it if the ring is full"""
+        idx = self._ring_idx
+        head = idx[0]
+        nxt = (head + 1) % RING_SLOTS
+        if nxt == idx[1]:
+            self._ring_dropped += 1
+            return
+        
+        self._pack_record(i, self._ring[head], 0)
+        idx[0] = nxt
+
+    def _reserve_record(self):
+        """Return the block buffer offset for the next record, writing the block out if full"""
+        n = self._write_len
+        if n + RECORD_SIZE > DATA_BUFFER_SIZE:
+            with self._fs_lock:
+                self._data_fh.write(self._write_mv[:n])
+            n = 0
+        self._write_len = n + RECORD_SIZE
+        return n
+
+    def _buffer_record(self, record):
+        """Copy a packed record into the block buffer"""
+        n = self._reserve_record()
+        self._write_buf[n:n + RECORD_SIZE] = record
+
+    def _write_block(self):
+        """Write the pending block buffer to the data file and sync it to the card"""
+        with self._fs_lock:
+            if self._write_len:
+                self._data_fh.write(self._write_mv[:self._write_len])
+                self._write_len = 0
+            self._data_fh.flush()
+
+    def _flush_data(self):
+        """Write the pending RAM buffer to the data file and sync it to the card"""
+        if not self._data_fh:
+            return
+        
+        # The writer owns the block buffer while it runs, so only ask it to flush
+        if self._writer_running:
+            self._writer_ctl[0] += 1
+            return
+        
+        try:
+            self._write_block()
+        except Exception as e:
+            self._log(f"Error flushing data: {str(e)}", "ERROR")
+
+    @micropython.native
+    def _pack_record(self, i, buf, offset):
+        """Pack sample slot i as a binary record into buf at offset"""
+        struct.pack_into(DATA_FORMAT, buf, offset,
+                         self.buf_ts[i], self.buf_temp[i], self.buf_pressure[i],
+                         self.buf_altitude[i], self.buf_ax[i], self.buf_ay[i], self.buf_az[i],
+                         self.buf_gx[i], self.buf_gy[i], self.buf_gz[i], self.buf_lat[i],
+                         self.buf_lon[i])
+
+    def _save_samples(self):
+        """Save every buffered sample and empty the sample buffer"""
+        for i in range(self._buf_idx):
+            self._save_data(i)
+        self._buf_idx = 0
+
+    def _echo_readings(self, i):
+        """Print sample slot i"""
+        temperature = self.buf_temp[i]
+        pressure = self.buf_pressure[i]
+        altitude = self.buf_altitude[i]
+        lines = [
+            "\nCurrent Readings:",
+            f"Temperature: {temperature}°C" if temperature == temperature else "Temperature: No reading",
+            f"Pressure: {pressure} hPa" if pressure == pressure else "Pressure: No reading",
+            f"Altitude: {altitude} m" if altitude == altitude else "Altitude: No reading",
+            f"Acceleration (x,y,z): {self.buf_ax[i]}, {self.buf_ay[i]}, {self.buf_az[i]}",
+        ]
+        if self.buf_lat[i] == self.buf_lat[i] and self.buf_lon[i] == self.buf_lon[i]:
+            lines.append(f"GPS: {self.buf_lat[i]}, {self.buf_lon[i]}")
+        lines.append("-------------------")
+        print("\n".join(lines))
+
+    def _save_data(self, i):
+        """Save sample slot i to local storage with improved error handling"""
+        if not self._data_fh:
+            return
+        
+        try:
+            # SD stalls are absorbed by core1 when the writer is running
+            if self._writer_running:
+                self._queue_record(i)
+            else:
+                self._pack_record(i, self._write_buf, self._reserve_record())
             
-            # Print current readings to terminal with proper formatting
-            print("\nCurrent Readings:")
-            print(f"Temperature: {data['temperature']}°C" if data['temperature'] is not None else "Temperature: No reading")
-            print(f"Pressure: {data['pressure']} hPa" if data['pressure'] is not None else "Pressure: No reading")
-            print(f"Altitude: {data['altitude']} m" if data['altitude'] is not None else "Altitude: No reading")
-            print(f"Acceleration (x,y,z): {data['ax']}, {data['ay']}, {data['az']}")
-            if data['latitude'] is not None and data['longitude'] is not None:
-                print(f"GPS: {data['latitude']}, {data['longitude']}")
-            print("-------------------")
+            # Terminal output over USB is slow, so readings are only echoed when verbose
+            # and at most once per ECHO_EVERY samples
+            if self._verbose:
+                self._echo_count += 1
+                if self._echo_count >= ECHO_EVERY:
+                    self._echo_count = 0
+                    self._echo_readings(i)
             
         except Exception as e:
             self._log(f"Error saving data: {str(e)}", "ERROR")
@@ -516,56 +987,57 @@ class CanSat:
         self._log("Starting main loop")
         self._log_event("Main Loop", "Program execution started")
         
-        last_button_press = 0
-        button_hold_start = None
-        last_status_print = 0
-        status_interval = 10  # Print status every 10 seconds
+        status_interval_ms = 10000  # Print status every 10 seconds
+        
+        # Start the status timer already expired so the first print happens immediately
+        now = time.ticks_ms()
+        last_status_print = time.ticks_add(now, -status_interval_ms)
         
         while True:
             try:
-                current_time = time.time()
+                now = time.ticks_ms()
                 
-                # Button handling with improved hold detection
-                if not self.button.value():
-                    if button_hold_start is None:
-                        button_hold_start = current_time
-                    elif current_time - button_hold_start > 3:  # 3 second hold
-                        self._log_event("Button Hold", "3-second shutdown triggered")
-                        self._safe_shutdown()
-                        break
-                else:
-                    if button_hold_start is not None:
-                        if current_time - last_button_press > 0.5:  # Debounce
-                            last_button_press = current_time
-                            self._handle_button_press()
-                    button_hold_start = None
+                # Button events are detected by the pin IRQ and hold timer
+                if self._hold_fired:
+                    self._hold_fired = False
+                    self._log_event("Button Hold", "3-second shutdown triggered")
+                    self._safe_shutdown()
+                    break
+                if self._button_pending:
+                    self._button_pending = False
+                    self._handle_button_press()
                 
                 # Data collection in appropriate states
                 if self.state in [FlightStates.ASCENT, FlightStates.DESCENT]:
-                    data = self._collect_sensor_data()
-                    self.data_buffer.append(data)
+                    self._collect_sensor_data()
                     
                     # Periodic status update
-                    if current_time - last_status_print >= status_interval:
-                        self._log(f"Current State: {FlightStates.get_state_name(self.state)}")
-                        if self.last_altitude is not None:
+                    if time.ticks_diff(now, last_status_print) >= status_interval_ms:
+                        self._log(f"Current State: {self._state_name}")
+                        if self.last_altitude == self.last_altitude:
                             self._log(f"Current Altitude: {self.last_altitude}m")
-                        last_status_print = current_time
+                        self._check_writer()
+                        if self._ring_dropped:
+                            self._log(f"SD writer ring full, {self._ring_dropped} records dropped", "WARNING")
+                        if self.bme_ok:
+                            for code, value in self.bme.pop_warnings():
+                                self._log(f"BME280 warning {code}: {value}", "WARNING")
+                        last_status_print = now
                     
-                    # Save data periodically
-                    if current_time - self.last_save_time >= self.save_interval:
-                        for buffered_data in self.data_buffer:
-                            self._save_data(buffered_data)
-                        self.data_buffer = []
-                        self.last_save_time = current_time
+                    # Save data periodically, or straight away when core1 batches the card writes
+                    if (self._writer_running or self._buf_idx >= SAMPLE_SLOTS or
+                            time.ticks_diff(now, self.last_save_time) >= self.save_interval_ms):
+                        self._save_samples()
+                        self.last_save_time = now
                 
                 # Check for landing state transition
-                if self.state == FlightStates.DESCENT and self.last_altitude is not None:
+                if self.state == FlightStates.DESCENT and self.last_altitude == self.last_altitude:
                     if self.last_altitude < 10:  # Below 10 meters
-                        consecutive_low_readings = getattr(self, '_consecutive_low_readings', 0) + 1
+                        consecutive_low_readings = self._consecutive_low_readings + 1
                         if consecutive_low_readings > 5:  # 5 consecutive low readings
-                            self.state = FlightStates.LANDED
-                            self._log_event("Landing Confirmed", f"Final altitude: {self.last_altitude}m")
+                            self._set_state(FlightStates.LANDED)
+                            self._log_event("Landing Confirmed", f"Final altitude: {self.last_altitude}m", flush=True)
+                            self._flush_data()
                         self._consecutive_low_readings = consecutive_low_readings
                     else:
                         self._consecutive_low_readings = 0
@@ -580,13 +1052,46 @@ class CanSat:
                 self._blink_pattern(self.led_red, [0.1, 0.1, 0.1])
                 sleep(1)
 
+    def _button_isr(self, pin):
+        """Pin IRQ: defer edge handling out of interrupt context"""
+        try:
+            micropython.schedule(self._button_edge_cb, 0)
+        except RuntimeError:
+            # Schedule queue full; the next edge will catch up
+            pass
+
+    def _on_button_edge(self, _):
+        """
+        Track presses from button edges
+        
+        The settled pin level is read here rather than in the ISR, so contact
+        bounce collapses into a single press and release. A press arms the
+        hold timer; a release cancels it and queues a press if debounced.
+        """
+        pressed = not self.button.value()
+        if pressed and not self._button_down:
+            self._button_down = True
+            self._hold_timer.init(mode=Timer.ONE_SHOT, period=BUTTON_HOLD_MS, callback=self._hold_cb)
+        elif not pressed and self._button_down:
+            self._button_down = False
+            self._hold_timer.deinit()
+            now = time.ticks_ms()
+            if not self._hold_fired and time.ticks_diff(now, self._last_button_press) > BUTTON_DEBOUNCE_MS:
+                self._last_button_press = now
+                self._button_pending = True
+
+    def _on_button_hold(self, timer):
+        """Hold timer expired with the button still down"""
+        if self._button_down:
+            self._hold_fired = True
+
     def _handle_button_press(self):
         """Handle button press with state transitions and event logging"""
         if self.state == FlightStates.WAITING_START:
             self._log_event("Button Press", "Initializing sensors")
             if self.init_sensors():
                 self._event_buzzer_patterns("SENSORS_READY")
-                self.state = FlightStates.READY
+                self._set_state(FlightStates.READY)
                 self._log_event("State Change", "System ready for flight")
                 print("\n=== System Ready ===")
                 print("Press button again to start data collection")
@@ -596,44 +1101,72 @@ class CanSat:
                 
         elif self.state == FlightStates.READY:
             self._event_buzzer_patterns("FLIGHT_START")
-            self.state = FlightStates.ASCENT
+            self._set_state(FlightStates.ASCENT)
             self._log_event("Flight Start", "Data collection initiated")
             print("\n=== Data Collection Started ===")
             print("Hold button for 3 seconds to stop and shutdown")
             print("===========================\n")
 
     def _update_leds(self):
-        """Update LED states based on current system state with improved patterns"""
-        if self.state == FlightStates.WAITING_START:
+        """
+        Update LED states based on current system state with improved patterns
+        
+        Never sleeps: each call only acts once the current phase has expired,
+        so the main loop keeps its 10 Hz cadence.
+        """
+        now = time.ticks_ms()
+        state = self.state
+        if state != self._led_state:
+            # Start the new state's pattern straight away
+            self._led_state = state
+            self._led_phase = False
+            self._led_next_ms = now
+        elif time.ticks_diff(now, self._led_next_ms) < 0:
+            return
+        
+        red = self.led_red.value()
+        green = self.led_green.value()
+        if state == FlightStates.WAITING_START:
             # Slow blink for waiting
-            self.led_red.toggle()
-            self.led_green.off()
-            sleep(0.5)
+            red = not red
+            green = 0
+            interval_ms = 500
             
-        elif self.state == FlightStates.READY:
+        elif state == FlightStates.READY:
             # Solid green for ready
-            self.led_green.on()
-            self.led_red.off()
+            green = 1
+            red = 0
+            interval_ms = 1000
             
-        elif self.state == FlightStates.ASCENT:
+        elif state == FlightStates.ASCENT:
             # Alternating fast blink for ascent
-            self.led_green.toggle()
-            self.led_red.off()
-            sleep(0.2)
+            green = not green
+            red = 0
+            interval_ms = 200
             
-        elif self.state == FlightStates.DESCENT:
+        elif state == FlightStates.DESCENT:
             # Both LEDs alternating for descent
-            self.led_green.toggle()
-            self.led_red.value(not self.led_green.value())
-            sleep(0.2)
+            green = not green
+            red = not green
+            interval_ms = 200
             
-        elif self.state == FlightStates.LANDED:
+        elif state == FlightStates.LANDED:
             # Quick green pulses for landed
-            self.led_green.on()
-            sleep(0.1)
-            self.led_green.off()
-            sleep(0.9)
-            self.led_red.off()
+            self._led_phase = not self._led_phase
+            green = self._led_phase
+            red = 0
+            interval_ms = 100 if self._led_phase else 900
+            
+        else:
+            return
+        
+        # An LED running a blink pattern is skipped until the pattern ends
+        blink = self._blink_led
+        if self.led_red is not blink:
+            self.led_red.value(red)
+        if self.led_green is not blink:
+            self.led_green.value(green)
+        self._led_next_ms = time.ticks_add(now, interval_ms)
 
 def main():
     """Main function with comprehensive error handling and logging"""
@@ -3,9 +3,58 @@ MPU6050 MicroPython driver for the RP2040.
 Handles acceleration, gyroscope and temperature measurements.
 """
 from machine import Pin, I2C
+import array
 import struct
 import time
 
+try:
+    import micropython
+except ImportError:
+    # Host-side Python: the code emitter decorators become no-ops
+    class micropython:
+        @staticmethod
+        def viper(func):
+            return func
+    ptr8 = ptr32 = None
+
+
+@micropython.viper
+def _decode_motion(buf: ptr8, out: ptr32):
+    """
+    Decode a 14-byte ACCEL_XOUT_H burst into six signed axis values
+    
+    The temperature word at bytes 6-7 is skipped. Each big-endian word is
+    sign-extended without a branch.
+    """
+    v = (buf[0] << 8) | buf[1]
+    out[0] = v - ((v & 0x8000) << 1)
+    v = (buf[2] << 8) | buf[3]
+    out[1] = v - ((v & 0x8000) << 1)
+    v = (buf[4] << 8) | buf[5]
+    out[2] = v - ((v & 0x8000) << 1)
+    v = (buf[8] << 8) | buf[9]
+    out[3] = v - ((v & 0x8000) << 1)
+    v = (buf[10] << 8) | buf[11]
+    out[4] = v - ((v & 0x8000) << 1)
+    v = (buf[12] << 8) | buf[13]
+    out[5] = v - ((v & 0x8000) << 1)
+
+
+@micropython.viper
+def _decode_fifo(buf: ptr8, out: ptr32, count: int):
+    """
+    Decode count 12-byte FIFO samples (accel xyz then gyro xyz) into out
+    
+    Sample i lands in out[6 * i] to out[6 * i + 5].
+    """
+    n = count * 6
+    i = 0
+    while i < n:
+        v = (buf[2 * i] << 8) | buf[2 * i + 1]
+        out[i] = v - ((v & 0x8000) << 1)
+        i += 1
+
+
 class MPU6050:
     # Device I2C Address
     MPU6050_ADDR = 0x68
@@ -35,6 +84,10 @@ class MPU6050:
     GYRO_YOUT_L = 0x46
     GYRO_ZOUT_H = 0x47
     GYRO_ZOUT_L = 0x48
+    INT_STATUS = 0x3A
+    USER_CTRL = 0x6A
+    FIFO_COUNTH = 0x72
+    FIFO_R_W = 0x74
     PWR_MGMT_1 = 0x6B
     PWR_MGMT_2 = 0x6C
     WHO_AM_I = 0x75
@@ -59,6 +112,25 @@ class MPU6050:
     GYRO_SCALE_MODIFIER_500DEG = 65.5
     GYRO_SCALE_MODIFIER_1000DEG = 32.8
     GYRO_SCALE_MODIFIER_2000DEG = 16.4
+    
+    # FIFO holds accel and gyro words only: 12 bytes per sample
+    FIFO_SIZE = 1024
+    FIFO_SAMPLE_BYTES = 12
+    FIFO_MAX_SAMPLES = FIFO_SIZE // FIFO_SAMPLE_BYTES
+    
+    # Reciprocal scale per range, so readings are scaled with a multiply
+    _ACCEL_INV = {
+        ACCEL_FS_SEL_2G: 1.0 / ACCEL_SCALE_MODIFIER_2G,
+        ACCEL_FS_SEL_4G: 1.0 / ACCEL_SCALE_MODIFIER_4G,
+        ACCEL_FS_SEL_8G: 1.0 / ACCEL_SCALE_MODIFIER_8G,
+        ACCEL_FS_SEL_16G: 1.0 / ACCEL_SCALE_MODIFIER_16G,
+    }
+    _GYRO_INV = {
+        GYRO_FS_SEL_250: 1.0 / GYRO_SCALE_MODIFIER_250DEG,
+        GYRO_FS_SEL_500: 1.0 / GYRO_SCALE_MODIFIER_500DEG,
+        GYRO_FS_SEL_1000: 1.0 / GYRO_SCALE_MODIFIER_1000DEG,
+        GYRO_FS_SEL_2000: 1.0 / GYRO_SCALE_MODIFIER_2000DEG,
+    }
 
     def __init__(self, i2c, address=MPU6050_ADDR):
         """Initialize the MPU6050.
@@ -69,6 +141,14 @@ class MPU6050:
         """
         self.i2c = i2c
         self.address = address
+        self._motion_buf = bytearray(14)
+        self._motion_raw = array.array('i', [0] * 6)
+        self._axis_buf = bytearray(6)
+        self._count_buf = bytearray(2)
+        self._fifo_buf = bytearray(self.FIFO_MAX_SAMPLES * self.FIFO_SAMPLE_BYTES)
+        self._fifo_mv = memoryview(self._fifo_buf)
+        self.fifo_raw = array.array('i', [0] * (6 * self.FIFO_MAX_SAMPLES))
+        self.fifo_data = array.array('f', [0.0] * (6 * self.FIFO_MAX_SAMPLES))
         
         # Wake up the MPU6050 and verify it's responding
         self._verify_device()
@@ -111,19 +191,37 @@ class MPU6050:
         data = self.i2c.readfrom_mem(self.address, reg, 2)
         return struct.unpack('>h', data)[0]
 
+    def _read_words(self, reg, n):
+        """Read n consecutive signed words in a single burst.
+        
+        Three-word (one sensor's x, y, z) reads reuse a preallocated buffer.
+        """
+        if n == 3:
+            buf = self._axis_buf
+            self.i2c.readfrom_mem_into(self.address, reg, buf)
+            return struct.unpack('>hhh', buf)
+        data = self.i2c.readfrom_mem(self.address, reg, 2 * n)
+        return struct.unpack('>' + 'h' * n, data)
+
     def _write_byte(self, reg, val):
         """Write a byte to the device."""
         self.i2c.writeto_mem(self.address, reg, bytes([val]))
 
     def _set_accel_range(self, accel_range):
-        """Set the accelerometer range."""
+        """Set the accelerometer range and cache its reciprocal scale."""
+        if accel_range not in self._ACCEL_INV:
+            raise ValueError("Unsupported accelerometer range 0x%x" % accel_range)
         self._write_byte(self.ACCEL_CONFIG, accel_range)
         self.accel_range = accel_range
+        self._accel_inv = self._ACCEL_INV[accel_range]
 
     def _set_gyro_range(self, gyro_range):
-        """Set the gyroscope range."""
+        """Set the gyroscope range and cache its reciprocal scale."""
+        if gyro_range not in self._GYRO_INV:
+            raise ValueError("Unsupported gyroscope range 0x%x" % gyro_range)
         self._write_byte(self.GYRO_CONFIG, gyro_range)
         self.gyro_range = gyro_range
+        self._gyro_inv = self._GYRO_INV[gyro_range]
 
     def get_acceleration(self):
         """Read acceleration data.
@@ -131,25 +229,10 @@ class MPU6050:
         Returns:
             Tuple of (x, y, z) acceleration values in g's
         """
-        x = self._read_word(self.ACCEL_XOUT_H)
-        y = self._read_word(self.ACCEL_YOUT_H)
-        z = self._read_word(self.ACCEL_ZOUT_H)
-        
-        scale_modifier = None
-        if self.accel_range == self.ACCEL_FS_SEL_2G:
-            scale_modifier = self.ACCEL_SCALE_MODIFIER_2G
-        elif self.accel_range == self.ACCEL_FS_SEL_4G:
-            scale_modifier = self.ACCEL_SCALE_MODIFIER_4G
-        elif self.accel_range == self.ACCEL_FS_SEL_8G:
-            scale_modifier = self.ACCEL_SCALE_MODIFIER_8G
-        elif self.accel_range == self.ACCEL_FS_SEL_16G:
-            scale_modifier = self.ACCEL_SCALE_MODIFIER_16G
-            
-        x = x / scale_modifier
-        y = y / scale_modifier
-        z = z / scale_modifier
+        x, y, z = self._read_words(self.ACCEL_XOUT_H, 3)
+        inv = self._accel_inv
         
-        return (x, y, z)
+        return (x * inv, y * inv, z * inv)
 
     def get_rotation(self):
         """Read gyroscope data.
@@ -157,25 +240,141 @@ class MPU6050:
         Returns:
             Tuple of (x, y, z) rotation values in degrees/second
         """
-        x = self._read_word(self.GYRO_XOUT_H)
-        y = self._read_word(self.GYRO_YOUT_H)
-        z = self._read_word(self.GYRO_ZOUT_H)
-        
-        scale_modifier = None
-        if self.gyro_range == self.GYRO_FS_SEL_250:
-            scale_modifier = self.GYRO_SCALE_MODIFIER_250DEG
-        elif self.gyro_range == self.GYRO_FS_SEL_500:
-            scale_modifier = self.GYRO_SCALE_MODIFIER_500DEG
-        elif self.gyro_range == self.GYRO_FS_SEL_1000:
-            scale_modifier = self.GYRO_SCALE_MODIFIER_1000DEG
-        elif self.gyro_range == self.GYRO_FS_SEL_2000:
-            scale_modifier = self.GYRO_SCALE_MODIFIER_2000DEG
-            
-        x = x / scale_modifier
-        y = y / scale_modifier
-        z = z / scale_modifier
+        x, y, z = self._read_words(self.GYRO_XOUT_H, 3)
+        inv = self._gyro_inv
+        
+        return (x * inv, y * inv, z * inv)
+
+    def get_motion6_raw(self):
+        """Read raw acceleration and rotation in a single 14-byte burst.
+        
+        The accelerometer, temperature and gyroscope registers are
+        contiguous from ACCEL_XOUT_H, so one I2C transaction covers all
+        six axes; the temperature word is skipped.
+        
+        Returns:
+            array('i') of (ax, ay, az, gx, gy, gz) in LSBs. The same array
+            is reused by every call.
+        """
+        self.i2c.readfrom_mem_into(self.address, self.ACCEL_XOUT_H, self._motion_buf)
+        _decode_motion(self._motion_buf, self._motion_raw)
+        return self._motion_raw
+
+    def get_motion6(self):
+        """Read acceleration and rotation in a single 14-byte burst.
+        
+        Returns:
+            Tuple of (ax, ay, az, gx, gy, gz) in g's and degrees/second
+        """
+        ax, ay, az, gx, gy, gz = self.get_motion6_raw()
+        
+        a = self._accel_inv
+        g = self._gyro_inv
+        
+        return (ax * a, ay * a, az * a, gx * g, gy * g, gz * g)
+
+    def enable_fifo(self, sample_div=None):
+        """Start streaming accel and gyro samples into the on-chip FIFO.
+        
+        The sensor then buffers samples at its own sample rate (1 kHz with
+        the default configuration) and the host drains them in batches with
+        read_fifo(), one I2C burst per batch instead of one per sample.
+        
+        Args:
+            sample_div: Optional SMPLRT_DIV value; the sample rate becomes
+                8 kHz / (1 + sample_div). Lower rates let a slower host
+                drain the 1024-byte FIFO before it overflows.
+        """
+        if sample_div is not None:
+            self._write_byte(self.SMPLRT_DIV, sample_div)
+        self._write_byte(self.FIFO_EN, 0x00)
+        self._write_byte(self.USER_CTRL, 0x04)  # FIFO_RESET
+        self._write_byte(self.USER_CTRL, 0x40)  # FIFO_EN
+        self._write_byte(self.FIFO_EN, 0x78)    # XG, YG, ZG and ACCEL
+        self._read_byte(self.INT_STATUS)        # Clear any stale overflow flag
+
+    def disable_fifo(self):
+        """Stop filling the FIFO."""
+        self._write_byte(self.FIFO_EN, 0x00)
+        self._write_byte(self.USER_CTRL, 0x00)
+
+    def read_fifo_raw(self):
+        """Drain the complete samples currently in the FIFO.
+        
+        If the FIFO overflowed, sample alignment is lost, so it is reset
+        and nothing is returned for that call.
+        
+        Returns:
+            Number of samples decoded into fifo_raw, six signed LSB values
+            (ax, ay, az, gx, gy, gz) per sample
+        """
+        if self._read_byte(self.INT_STATUS) & 0x10:  # FIFO_OFLOW_INT
+            self._write_byte(self.USER_CTRL, 0x44)  # FIFO_EN | FIFO_RESET
+            return 0
+        
+        self.i2c.readfrom_mem_into(self.address, self.FIFO_COUNTH, self._count_buf)
+        count = ((self._count_buf[0] << 8) | self._count_buf[1]) // self.FIFO_SAMPLE_BYTES
+        if count > self.FIFO_MAX_SAMPLES:
+            count = self.FIFO_MAX_SAMPLES
+        if count:
+            n = count * self.FIFO_SAMPLE_BYTES
+            self.i2c.readfrom_mem_into(self.address, self.FIFO_R_W, self._fifo_mv[:n])
+            _decode_fifo(self._fifo_buf, self.fifo_raw, count)
+        return count
+
+    def read_fifo(self):
+        """Drain the FIFO and scale the samples in one batch.
+        
+        Returns:
+            Number of samples written to fifo_data as (ax, ay, az, gx, gy, gz)
+            in g's and degrees/second, six values per sample
+        """
+        count = self.read_fifo_raw()
+        raw = self.fifo_raw
+        out = self.fifo_data
+        a = self._accel_inv
+        g = self._gyro_inv
+        for i in range(0, count * 6, 6):
+            out[i] = raw[i] * a
+            out[i + 1] = raw[i + 1] * a
+            out[i + 2] = raw[i + 2] * a
+            out[i + 3] = raw[i + 3] * g
+            out[i + 4] = raw[i + 4] * g
+            out[i + 5] = raw[i + 5] * g
+        return count
+
+    def read_fifo_mean(self):
+        """Drain the FIFO and average its samples into one reading.
+        
+        Averaging hides short spikes, so the Z acceleration sample with the
+        largest magnitude in the batch is returned as well.
+        
+        Returns:
+            Tuple of (ax, ay, az, gx, gy, gz, peak_az) in g's and
+            degrees/second, or None if the FIFO held no complete sample
+        """
+        count = self.read_fifo_raw()
+        if not count:
+            return None
+        
+        raw = self.fifo_raw
+        sax = say = saz = sgx = sgy = sgz = 0
+        peak = 0
+        for i in range(0, count * 6, 6):
+            z = raw[i + 2]
+            if abs(z) > abs(peak):
+                peak = z
+            sax += raw[i]
+            say += raw[i + 1]
+            saz += z
+            sgx += raw[i + 3]
+            sgy += raw[i + 4]
+            sgz += raw[i + 5]
         
-        return (x, y, z)
+        a = self._accel_inv / count
+        g = self._gyro_inv / count
+        return (sax * a, say * a, saz * a, sgx * g, sgy * g, sgz * g,
+                peak * self._accel_inv)
 
     def get_temperature(self):
         """Read temperature data.
@@ -1,13 +1,134 @@
 from machine import UART, Pin
+import array
+import struct
 import time
 
+try:
+    import micropython
+    from micropython import const
+except ImportError:
+    # Host-side Python: the code emitter decorators become no-ops
+    class micropython:
+        @staticmethod
+        def viper(func):
+            return func
+    ptr8 = ptr16 = None
+
+    def const(value):
+        return value
+
+# Most comma-separated fields recorded per sentence (GGA has 15)
+_MAX_FIELDS = const(20)
+
+# Sentence types packed from their three ASCII letters
+_TAG_GGA = const(0x474741)
+_TAG_RMC = const(0x524D43)
+
+# Minutes to degrees, as a multiply
+_INV_60 = 1.0 / 60.0
+
+# UBX message class/IDs used in binary mode
+_UBX_CLASS_NAV = const(0x01)
+_UBX_NAV_POSLLH = const(0x02)
+_UBX_NAV_SOL = const(0x06)
+_UBX_NAV_VELNED = const(0x12)
+_UBX_NAV_TIMEUTC = const(0x21)
+_UBX_CLASS_CFG = const(0x06)
+_UBX_CFG_PRT = const(0x00)
+_UBX_CFG_MSG = const(0x01)
+
+
+@micropython.viper
+def _nmea_xor(buf: ptr8, start: int, end: int) -> int:
+    """XOR the bytes of buf[start:end] to form an NMEA checksum"""
+    s = 0
+    i = start
+    while i < end:
+        s = s ^ int(buf[i])
+        i += 1
+    return s
+
+
+@micropython.viper
+def _find_byte(buf: ptr8, start: int, end: int, value: int) -> int:
+    """Return the index of the first value byte in buf[start:end], or -1"""
+    i = start
+    while i < end:
+        if int(buf[i]) == value:
+            return i
+        i += 1
+    return -1
+
+
+@micropython.viper
+def _scan_fields(buf: ptr8, start: int, end: int, idx: ptr16) -> int:
+    """
+    Record where each comma-separated field of buf[start:end] begins
+    
+    Field i spans idx[i] to idx[i + 1] - 1, so idx needs room for one entry
+    past the last field. Returns the number of fields.
+    """
+    n = 0
+    idx[0] = start
+    i = start
+    while i < end:
+        if buf[i] == 0x2C and n < _MAX_FIELDS - 1:  # ','
+            n += 1
+            idx[n] = i + 1
+        i += 1
+    n += 1
+    idx[n] = end + 1
+    return n
+
+
+@micropython.viper
+def _parse_uint(buf: ptr8, start: int, end: int) -> int:
+    """Parse the decimal digits of buf[start:end], stopping at the first non-digit"""
+    v = 0
+    i = start
+    while i < end:
+        d = int(buf[i]) - 0x30
+        if d < 0 or d > 9:
+            break
+        v = v * 10 + d
+        i += 1
+    return v
+
+
+@micropython.viper
+def _ubx_checksum(buf: ptr8, start: int, end: int) -> int:
+    """Return the UBX Fletcher checksum of buf[start:end] packed as CK_B << 8 | CK_A"""
+    a = 0
+    b = 0
+    i = start
+    while i < end:
+        a = (a + int(buf[i])) & 0xFF
+        b = (b + a) & 0xFF
+        i += 1
+    return (b << 8) | a
+
+
+def _parse_float(buf, start, end):
+    """Parse a signed decimal number from buf[start:end] without building a str"""
+    neg = buf[start] == 0x2D  # '-'
+    if neg:
+        start += 1
+    dot = _find_byte(buf, start, end, 0x2E)  # '.'
+    if dot < 0:
+        value = _parse_uint(buf, start, end)
+    else:
+        value = _parse_uint(buf, start, dot) + _parse_uint(buf, dot + 1, end) / 10 ** (end - dot - 1)
+    return -value if neg else value
+
+
 class NEO6M:
     """
     NEO6M GPS module driver for Raspberry Pi Pico
-    Handles NMEA sentence parsing and GPS data extraction
+    Handles NMEA sentence parsing and GPS data extraction, or the UBX
+    binary NAV messages when the receiver is switched to binary output
     """
     
-    def __init__(self, uart_id=0, tx_pin=0, rx_pin=1, baud_rate=9600):
+    def __init__(self, uart_id=0, tx_pin=0, rx_pin=1, baud_rate=9600, ubx=False):
         """
         Initialize NEO6M GPS module
         
@@ -16,6 +137,7 @@ class NEO6M:
             tx_pin (int): TX pin number
             rx_pin (int): RX pin number
             baud_rate (int): UART baud rate (default 9600)
+            ubx (bool): Configure the receiver for UBX binary output instead of NMEA
         """
         self.uart = UART(uart_id, baudrate=baud_rate)
         self.uart.init(baudrate=baud_rate, tx=Pin(tx_pin), rx=Pin(rx_pin))
@@ -28,118 +150,260 @@ class NEO6M:
         self.time = None
         self.date = None
         self.fix_status = 0
-        self._last_update = 0
+        self._last_update = time.ticks_add(time.ticks_ms(), -1000)
+        
+        # Receive buffer; partial sentences are kept at the front
+        self._rxbuf = bytearray(512)
+        self._rxmv = memoryview(self._rxbuf)
+        self._rxlen = 0
+        self._fields = array.array('H', [0] * (_MAX_FIELDS + 1))
         
-        # Buffer for incoming data
-        self.buffer = ""
+        self.ubx = ubx
+        if ubx:
+            self._configure_ubx(baud_rate)
         
-    def _parse_gga(self, gga_data):
-        """Parse GPGGA sentence (Global Positioning System Fix Data)"""
+    def _send_ubx(self, msg_class, msg_id, payload):
+        """Frame a UBX message with its sync chars and checksum and send it"""
+        n = len(payload)
+        frame = bytearray(8 + n)
+        frame[0] = 0xB5
+        frame[1] = 0x62
+        struct.pack_into('<BBH', frame, 2, msg_class, msg_id, n)
+        frame[6:6 + n] = payload
+        ck = _ubx_checksum(frame, 2, 6 + n)
+        frame[6 + n] = ck & 0xFF
+        frame[7 + n] = ck >> 8
+        self.uart.write(frame)
+    
+    def _configure_ubx(self, baud_rate):
+        """
+        Switch UART1 output to UBX only and enable the NAV messages we parse
+        
+        The NEO-6 firmware has no NAV-PVT, so position, velocity, fix and
+        time come from NAV-POSLLH, NAV-VELNED, NAV-SOL and NAV-TIMEUTC.
+        """
+        # CFG-PRT: UART1, 8N1, same baud, accept UBX+NMEA in, UBX out
+        self._send_ubx(_UBX_CLASS_CFG, _UBX_CFG_PRT,
+                       struct.pack('<BBHIIHHHH', 1, 0, 0, 0x08D0, baud_rate, 0x0003, 0x0001, 0, 0))
+        time.sleep_ms(100)
+        for msg_id in (_UBX_NAV_POSLLH, _UBX_NAV_SOL, _UBX_NAV_VELNED, _UBX_NAV_TIMEUTC):
+            # CFG-MSG: one message per navigation epoch on the current port
+            self._send_ubx(_UBX_CLASS_CFG, _UBX_CFG_MSG, bytes((_UBX_CLASS_NAV, msg_id, 1)))
+            time.sleep_ms(20)
+    
+    def _parse_ubx(self, msg_class, msg_id, off, length):
+        """Unpack a checksummed UBX NAV payload held in the receive buffer at off"""
+        if msg_class != _UBX_CLASS_NAV:
+            return False
+        buf = self._rxbuf
+        if msg_id == _UBX_NAV_SOL and length == 52:
+            # gpsFix 2/3 with gpsFixOk set counts as a fix, like GGA quality 1
+            gps_fix = buf[off + 10]
+            fix_ok = buf[off + 11] & 0x01
+            self.fix_status = 1 if fix_ok and 2 <= gps_fix <= 3 else 0
+            self.satellites = buf[off + 47]
+        elif msg_id == _UBX_NAV_POSLLH and length == 28:
+            if self.fix_status:
+                lon, lat, _, h_msl = struct.unpack_from('<iiii', buf, off + 4)
+                self.latitude = lat * 1e-7
+                self.longitude = lon * 1e-7
+                self.altitude = h_msl * 0.001  # mm to metres
+        elif msg_id == _UBX_NAV_VELNED and length == 36:
+            g_speed = struct.unpack_from('<I', buf, off + 20)[0]
+            self.speed = g_speed * 0.036  # cm/s to km/h
+        elif msg_id == _UBX_NAV_TIMEUTC and length == 20:
+            if buf[off + 19] & 0x04:  # validUTC
+                year, month, day, hours, minutes, seconds = struct.unpack_from('<HBBBBB', buf, off + 12)
+                self.time = (hours, minutes, seconds)
+                self.date = (day, month, year)
+        else:
+            return False
+        return True
+    
+    def _scan_ubx(self, rxlen):
+        """
+        Parse every complete UBX frame in the receive buffer
+        
+        Returns the offset of the first byte that could still belong to an
+        incomplete frame.
+        """
+        buf = self._rxbuf
+        limit = len(buf) - 8
+        start = 0
+        while True:
+            sync = _find_byte(buf, start, rxlen, 0xB5)
+            if sync < 0:
+                return rxlen
+            if rxlen - sync < 8:
+                return sync
+            if buf[sync + 1] != 0x62:
+                start = sync + 1
+                continue
+            length = buf[sync + 4] | (buf[sync + 5] << 8)
+            if length > limit:
+                start = sync + 1
+                continue
+            end = sync + 6 + length
+            if end + 2 > rxlen:
+                return sync
+            if _ubx_checksum(buf, sync + 2, end) == buf[end] | (buf[end + 1] << 8):
+                self._parse_ubx(buf[sync + 2], buf[sync + 3], sync + 6, length)
+                start = end + 2
+            else:
+                start = sync + 1
+    
+    def _parse_gga(self, n):
+        """Parse the GPGGA sentence (Global Positioning System Fix Data) with n scanned fields"""
         try:
-            parts = gga_data.split(',')
-            if len(parts) >= 10:
+            if n >= 10:
+                buf = self._rxbuf
+                f = self._fields
                 # Check if we have a GPS fix
-                if parts[6] != '0':
-                    # Parse latitude
-                    if parts[2] and parts[3]:
-                        lat_deg = float(parts[2][:2])
-                        lat_min = float(parts[2][2:])
-                        lat_dec = lat_deg + (lat_min / 60.0)
-                        if parts[3] == 'S':
+                fix = _parse_uint(buf, f[6], f[7] - 1)
+                if fix:
+                    # Parse latitude (ddmm.mmmm)
+                    a = f[2]
+                    if f[3] - a > 3 and f[4] - f[3] > 1:
+                        lat_dec = _parse_uint(buf, a, a + 2) + _parse_float(buf, a + 2, f[3] - 1) * _INV_60
+                        if buf[f[3]] == 0x53:  # 'S'
                             lat_dec = -lat_dec
-                        self.latitude = round(lat_dec, 6)
+                        self.latitude = lat_dec
                     
-                    # Parse longitude
-                    if parts[4] and parts[5]:
-                        lon_deg = float(parts[4][:3])
-                        lon_min = float(parts[4][3:])
-                        lon_dec = lon_deg + (lon_min / 60.0)
-                        if parts[5] == 'W':
+                    # Parse longitude (dddmm.mmmm)
+                    a = f[4]
+                    if f[5] - a > 4 and f[6] - f[5] > 1:
+                        lon_dec = _parse_uint(buf, a, a + 3) + _parse_float(buf, a + 3, f[5] - 1) * _INV_60
+                        if buf[f[5]] == 0x57:  # 'W'
                             lon_dec = -lon_dec
-                        self.longitude = round(lon_dec, 6)
+                        self.longitude = lon_dec
                     
                     # Parse altitude
-                    if parts[9]:
-                        self.altitude = float(parts[9])
+                    if f[10] - f[9] > 1:
+                        self.altitude = _parse_float(buf, f[9], f[10] - 1)
                     
                     # Parse number of satellites
-                    if parts[7]:
-                        self.satellites = int(parts[7])
+                    if f[8] - f[7] > 1:
+                        self.satellites = _parse_uint(buf, f[7], f[8] - 1)
                     
-                    self.fix_status = int(parts[6])
+                    self.fix_status = fix
                     return True
             return False
         except:
             return False
             
-    def _parse_rmc(self, rmc_data):
-        """Parse GPRMC sentence (Recommended Minimum Navigation Information)"""
+    def _parse_rmc(self, n):
+        """Parse the GPRMC sentence (Recommended Minimum Navigation Information) with n scanned fields"""
         try:
-            parts = rmc_data.split(',')
-            if len(parts) >= 10:
-                # Parse time
-                if parts[1]:
-                    time_str = parts[1]
-                    if len(time_str) >= 6:
-                        hours = int(time_str[0:2])
-                        minutes = int(time_str[2:4])
-                        seconds = int(time_str[4:6])
-                        self.time = (hours, minutes, seconds)
+            if n >= 10:
+                buf = self._rxbuf
+                f = self._fields
+                # Parse time (hhmmss.ss)
+                a = f[1]
+                if f[2] - a > 6:
+                    hours = _parse_uint(buf, a, a + 2)
+                    minutes = _parse_uint(buf, a + 2, a + 4)
+                    seconds = _parse_uint(buf, a + 4, a + 6)
+                    self.time = (hours, minutes, seconds)
                 
-                # Parse date
-                if parts[9]:
-                    date_str = parts[9]
-                    if len(date_str) >= 6:
-                        day = int(date_str[0:2])
-                        month = int(date_str[2:4])
-                        year = 2000 + int(date_str[4:6])
-                        self.date = (day, month, year)
+                # Parse date (ddmmyy)
+                a = f[9]
+                if f[10] - a > 6:
+                    day = _parse_uint(buf, a, a + 2)
+                    month = _parse_uint(buf, a + 2, a + 4)
+                    year = 2000 + _parse_uint(buf, a + 4, a + 6)
+                    self.date = (day, month, year)
                 
                 # Parse speed (in knots, convert to km/h)
-                if parts[7]:
-                    self.speed = float(parts[7]) * 1.852  # Convert knots to km/h
+                if f[8] - f[7] > 1:
+                    self.speed = _parse_float(buf, f[7], f[8] - 1) * 1.852  # Convert knots to km/h
                     
                 return True
             return False
         except:
             return False
     
+    def _handle_sentence(self, start, end):
+        """Verify and parse the NMEA sentence held in the receive buffer at [start, end)"""
+        buf = self._rxbuf
+        if end > start and buf[end - 1] == 0x0D:  # '\r'
+            end -= 1
+        # Shortest useful sentence is "$GPxxx*hh"
+        if end - start < 9 or buf[start] != 0x24 or buf[end - 3] != 0x2A:  # '$', '*'
+            return
+        
+        # Only GGA and RMC are used, so check the type before the checksum
+        if buf[start + 1] != 0x47 or buf[start + 2] != 0x50:  # 'GP'
+            return
+        tag = (buf[start + 3] << 16) | (buf[start + 4] << 8) | buf[start + 5]
+        if tag != _TAG_GGA and tag != _TAG_RMC:
+            return
+        
+        try:
+            checksum = int(bytes(self._rxmv[end - 2:end]), 16)
+        except ValueError:
+            return
+        if checksum != _nmea_xor(buf, start + 1, end - 3):
+            return
+        
+        # Split the fields in place up to the '*'
+        n = _scan_fields(buf, start, end - 3, self._fields)
+        if tag == _TAG_GGA:
+            self._parse_gga(n)
+        else:
+            self._parse_rmc(n)
+    
     def update(self):
         """
-        Update GPS data by reading and parsing NMEA sentences
+        Update GPS data by reading and parsing NMEA sentences (or UBX frames)
         Returns True if new data was successfully parsed
+        
+        The getters below only return the last parsed values, so call this
+        once per application loop before reading them.
         """
-        if (time.time() - self._last_update) < 1:  # Limit update rate to 1Hz
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._last_update) < 1000:  # Limit update rate to 1Hz
             return False
             
-        while self.uart.any():
-            char = self.uart.read(1).decode('ascii', 'ignore')
-            if char == '\n':
-                sentence = self.buffer.strip()
-                self.buffer = ""
-                
-                if sentence.startswith('$'):
-                    try:
-                        # Verify checksum
-                        asterisk_index = sentence.rfind('*')
-                        if asterisk_index != -1:
-                            checksum = int(sentence[asterisk_index + 1:], 16)
-                            calc_checksum = 0
-                            for c in sentence[1:asterisk_index]:
-                                calc_checksum ^= ord(c)
-                            
-                            if checksum == calc_checksum:
-                                # Parse different NMEA sentences
-                                if sentence.startswith('$GPGGA'):
-                                    self._parse_gga(sentence)
-                                elif sentence.startswith('$GPRMC'):
-                                    self._parse_rmc(sentence)
-                    except:
-                        pass
+        # Bind the hot lookups once; the loop runs until the UART is drained
+        uart = self.uart
+        any_ = uart.any
+        readinto = uart.readinto
+        buf = self._rxbuf
+        mv = self._rxmv
+        size = len(buf)
+        rxlen = self._rxlen
+        ubx = self.ubx
+        handle = self._handle_sentence
+        
+        n = any_()
+        while n > 0:
+            if n > size - rxlen:
+                # Overrun: drop the stale partial sentence rather than the new data
+                rxlen = 0
+                n = min(n, size)
+            got = readinto(mv[rxlen:rxlen + n])
+            if not got:
+                break
+            rxlen += got
+            
+            if ubx:
+                start = self._scan_ubx(rxlen)
             else:
-                self.buffer += char
+                start = 0
+                nl = _find_byte(buf, 0, rxlen, 0x0A)
+                while nl >= 0:
+                    handle(start, nl)
+                    start = nl + 1
+                    nl = _find_byte(buf, start, rxlen, 0x0A)
+            
+            # Move the incomplete tail down to the front of the buffer
+            if start:
+                rxlen -= start
+                mv[:rxlen] = mv[start:start + rxlen]
+            n = any_()
+        self._rxlen = rxlen
         
-        self._last_update = time.time()
+        self._last_update = now
         return True
     
     def get_position(self):
@@ -147,19 +411,16 @@ class NEO6M:
         Get current latitude and longitude
         Returns tuple (latitude, longitude) or None if no fix
         """
-        self.update()
         if self.latitude is not None and self.longitude is not None:
             return (self.latitude, self.longitude)
         return None
     
     def get_altitude(self):
         """Get current altitude in meters or None if not available"""
-        self.update()
         return self.altitude
     
     def get_speed(self):
         """Get current speed in km/h or None if not available"""
-        self.update()
         return self.speed
     
     def get_datetime(self):
@@ -167,17 +428,14 @@ class NEO6M:
         Get current date and time from GPS
         Returns tuple ((year, month, day), (hours, minutes, seconds)) or None
         """
-        self.update()
         if self.date and self.time:
             return (self.date, self.time)
         return None
     
     def get_satellites(self):
         """Get number of satellites in view or None if not available"""
-        self.update()
         return self.satellites
     
     def has_fix(self):
         """Check if GPS has a valid fix"""
-        self.update()
         return self.fix_status > 0
\ No newline at end of file
@@ -16,8 +16,8 @@ gpsTime = None
 # Function to get GPS position data
 def getPositionData(gps_input):
     global FIX_STATUS, TIMEOUT, latitude, longitude, satellites, gpsTime
-    timeout = time.time() + 8  # Timeout set to 8 seconds
-    while time.time() < timeout:
+    deadline = time.ticks_add(time.ticks_ms(), 8000)  # Timeout set to 8 seconds
+    while time.ticks_diff(deadline, time.ticks_ms()) > 0:
         buff = gps_input.readline()
         if buff is not None:
             try:
@@ -53,13 +53,16 @@ def getPositionData(gps_input):
     TIMEOUT = True
 
 
+# Minutes to degrees, as a multiply
+_INV_60 = 1.0 / 60.0
+
 # Function to convert raw latitude/longitude to degrees
 def convertToDegree(raw_value):
     try:
         raw_float = float(raw_value)
         degrees = int(raw_float / 100)  # Extract degrees
         minutes = raw_float - (degrees * 100)  # Extract minutes
-        return round(degrees + (minutes / 60.0), 6)  # Convert to decimal degrees
+        return degrees + minutes * _INV_60  # Convert to decimal degrees
     except ValueError:
         return None
 
@@ -9,6 +9,90 @@ from scipy import signal
 import plotly.graph_objs as go
 import plotly.io as pio
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional; derived metrics fall back to numpy
+    njit = None
+
+# Columns loaded from the data CSV. Sensor channels are float32 (they were
+# logged as single precision); time and GPS keep float64 so they stay exact.
+_DTYPES = {
+    'timestamp': np.float64,
+    'temperature': np.float32, 'pressure': np.float32, 'altitude': np.float32,
+    'ax': np.float32, 'ay': np.float32, 'az': np.float32,
+    'gx': np.float32, 'gy': np.float32, 'gz': np.float32,
+    'latitude': np.float64, 'longitude': np.float64,
+}
+
+# Rows parsed per read_csv chunk
+CSV_CHUNK_ROWS = 65536
+
+# Most points drawn by the 3D trajectory plots
+PLOT_MAX_POINTS = 5000
+
+# Record layout written by sdcard_test.py (struct format "<fffI")
+SD_TEST_DTYPE = np.dtype([('temperature', '<f4'), ('humidity', '<f4'),
+                          ('pressure', '<f4'), ('light', '<u4')])
+
+def load_sd_test_records(path):
+    """
+    Load the binary records written by sdcard_test.py
+    
+    Args:
+        path (str): Path to sensor_data.bin
+    
+    Returns:
+        pandas.DataFrame: One row per record
+    """
+    return pd.DataFrame(np.fromfile(path, dtype=SD_TEST_DTYPE))
+
+def read_flight_data(data_file, chunksize=CSV_CHUNK_ROWS):
+    """
+    Stream the data CSV into preallocated per-column arrays
+    
+    Only one chunk of parsed text is held at a time, so peak memory is the
+    final columns plus a chunk rather than a whole extra copy of the file.
+    
+    Args:
+        data_file (str): Path to the data CSV file
+        chunksize (int): Rows parsed per chunk
+    
+    Returns:
+        pandas.DataFrame: The known columns present in the file
+    """
+    # Upper bound on the row count; blank lines are dropped by the parser
+    with open(data_file) as f:
+        n = max(sum(1 for _ in f) - 1, 0)
+    
+    columns = {}
+    offset = 0
+    for chunk in pd.read_csv(data_file, dtype=_DTYPES, engine='c', chunksize=chunksize,
+                             usecols=lambda col: col in _DTYPES):
+        if not columns:
+            columns = {col: np.empty(n, dtype=chunk[col].dtype) for col in chunk.columns}
+        rows = len(chunk)
+        for col, arr in columns.items():
+            arr[offset:offset + rows] = chunk[col].to_numpy()
+        offset += rows
+    
+    return pd.DataFrame({col: arr[:offset] for col, arr in columns.items()})
+
+if njit is not None:
+    # Fast-math without 'nnan': the inputs keep leading NaNs and the kernel
+    # writes NaN itself, so the compiler must not assume NaN-free values
+    @njit(parallel=True, fastmath={'contract', 'arcp', 'reassoc'}, cache=True)
+    def _derive_metrics(ax, ay, az, gx, gy, gz, alt, out_accel, out_gyro, out_vv):
+        """Fill the accel/gyro magnitudes and vertical velocity in one pass"""
+        n = len(ax)
+        for i in prange(n):
+            out_accel[i] = np.sqrt(ax[i] * ax[i] + ay[i] * ay[i] + az[i] * az[i])
+            out_gyro[i] = np.sqrt(gx[i] * gx[i] + gy[i] * gy[i] + gz[i] * gz[i])
+            if i > 0:
+                out_vv[i] = (alt[i] - alt[i - 1]) * 10.0  # Assuming 10Hz sampling
+        if n > 0:
+            out_vv[0] = np.nan
+
 class CanSatDataAnalyzer:
     def __init__(self, data_file, events_file, output_dir=None):
         """
@@ -20,7 +104,7 @@ class CanSatDataAnalyzer:
             output_dir (str, optional): Directory to save visualizations
         """
         # Load data
-        self.data = pd.read_csv(data_file)
+        self.data = read_flight_data(data_file)
         self.events = pd.read_csv(events_file)
         
         # Convert timestamp to datetime
@@ -62,38 +146,63 @@ class CanSatDataAnalyzer:
         Returns:
             pandas.DataFrame: Data with derived metrics
         """
-        # Total acceleration magnitude
-        self.data['total_accel'] = np.sqrt(
-            self.data['ax']**2 + 
-            self.data['ay']**2 + 
-            self.data['az']**2
-        )
+        if njit is not None:
+            cols = [self.data[c].to_numpy(dtype=np.float32)
+                    for c in ('ax', 'ay', 'az', 'gx', 'gy', 'gz', 'altitude')]
+            n = len(self.data)
+            total_accel = np.empty(n, np.float32)
+            total_gyro = np.empty(n, np.float32)
+            vertical_velocity = np.empty(n, np.float32)
+            _derive_metrics(*cols, total_accel, total_gyro, vertical_velocity)
+            self.data['total_accel'] = total_accel
+            self.data['total_gyro'] = total_gyro
+            self.data['vertical_velocity'] = vertical_velocity
+            return self.data
+        
+        # Total acceleration magnitude, as one fused row-wise dot product in float32
+        accel = self.data[['ax', 'ay', 'az']].to_numpy(dtype=np.float32)
+        self.data['total_accel'] = np.sqrt(np.einsum('ij,ij->i', accel, accel))
         
         # Total gyroscope rotation magnitude
-        self.data['total_gyro'] = np.sqrt(
-            self.data['gx']**2 + 
-            self.data['gy']**2 + 
-            self.data['gz']**2
-        )
+        gyro = self.data[['gx', 'gy', 'gz']].to_numpy(dtype=np.float32)
+        self.data['total_gyro'] = np.sqrt(np.einsum('ij,ij->i', gyro, gyro))
         
         # Vertical velocity (simple derivative of altitude)
-        self.data['vertical_velocity'] = self.data['altitude'].diff() / 0.1  # Assuming 10Hz sampling
+        altitude = self.data['altitude'].to_numpy()
+        self.data['vertical_velocity'] = np.diff(altitude, prepend=np.nan) * 10.0  # Assuming 10Hz sampling
         
         return self.data
     
+    def _plot_sample(self, max_points=PLOT_MAX_POINTS):
+        """
+        Evenly spaced subset of the data for plotting
+        
+        Args:
+            max_points (int): Maximum number of rows to return
+        
+        Returns:
+            pandas.DataFrame: The data itself if it is already small enough
+        """
+        n = len(self.data)
+        if n <= max_points:
+            return self.data
+        idx = np.linspace(0, n - 1, max_points, dtype=int)
+        return self.data.iloc[idx]
+    
     def plot_3d_trajectory(self):
         """
         Create a 3D trajectory plot using acceleration and altitude
         """
+        sub = self._plot_sample()
         fig = plt.figure(figsize=(12, 8))
         ax = fig.add_subplot(111, projection='3d')
         
         # Plot 3D trajectory
         scatter = ax.scatter(
-            self.data['ax'], 
-            self.data['ay'], 
-            self.data['az'], 
-            c=self.data['altitude'], 
+            sub['ax'], 
+            sub['ay'], 
+            sub['az'], 
+            c=sub['altitude'], 
             cmap='viridis'
         )
         
@@ -114,38 +223,44 @@ class CanSatDataAnalyzer:
         fig, axs = plt.subplots(3, 2, figsize=(15, 12))
         fig.suptitle('CanSat Sensor Data Overview')
         
+        # Convert the time axis and pull the columns out of pandas once
+        x = self.data.index.to_numpy()
+        col = {c: self.data[c].to_numpy() for c in
+               ('altitude', 'temperature', 'pressure', 'ax', 'ay', 'az', 'gx', 'gy', 'gz')}
+        line = dict(linewidth=0.5, rasterized=True)
+        
         # Altitude plot
-        axs[0, 0].plot(self.data.index, self.data['altitude'])
+        axs[0, 0].plot(x, col['altitude'], **line)
         axs[0, 0].set_title('Altitude')
         axs[0, 0].set_ylabel('Meters')
         
         # Temperature plot
-        axs[0, 1].plot(self.data.index, self.data['temperature'], color='red')
+        axs[0, 1].plot(x, col['temperature'], color='red', **line)
         axs[0, 1].set_title('Temperature')
         axs[0, 1].set_ylabel('°C')
         
         # Acceleration plots
-        axs[1, 0].plot(self.data.index, self.data['ax'], label='X')
-        axs[1, 0].plot(self.data.index, self.data['ay'], label='Y')
-        axs[1, 0].plot(self.data.index, self.data['az'], label='Z')
+        axs[1, 0].plot(x, col['ax'], label='X', **line)
+        axs[1, 0].plot(x, col['ay'], label='Y', **line)
+        axs[1, 0].plot(x, col['az'], label='Z', **line)
         axs[1, 0].set_title('Acceleration')
         axs[1, 0].legend()
         
         # Gyroscope plots
-        axs[1, 1].plot(self.data.index, self.data['gx'], label='X')
-        axs[1, 1].plot(self.data.index, self.data['gy'], label='Y')
-        axs[1, 1].plot(self.data.index, self.data['gz'], label='Z')
+        axs[1, 1].plot(x, col['gx'], label='X', **line)
+        axs[1, 1].plot(x, col['gy'], label='Y', **line)
+        axs[1, 1].plot(x, col['gz'], label='Z', **line)
         axs[1, 1].set_title('Gyroscope')
         axs[1, 1].legend()
         
         # Pressure plot
-        axs[2, 0].plot(self.data.index, self.data['pressure'])
+        axs[2, 0].plot(x, col['pressure'], **line)
         axs[2, 0].set_title('Pressure')
         axs[2, 0].set_ylabel('hPa')
         
         # GPS plot (if available)
         if 'latitude' in self.data.columns and 'longitude' in self.data.columns:
-            axs[2, 1].plot(self.data['longitude'], self.data['latitude'])
+            axs[2, 1].plot(self.data['longitude'].to_numpy(), self.data['latitude'].to_numpy(), **line)
             axs[2, 1].set_title('GPS Trajectory')
             axs[2, 1].set_xlabel('Longitude')
             axs[2, 1].set_ylabel('Latitude')
@@ -158,13 +273,14 @@ class CanSatDataAnalyzer:
         """
         Create an interactive 3D trajectory plot using Plotly
         """
+        sub = self._plot_sample()
         trace = go.Scatter3d(
-            x=self.data['ax'],
-            y=self.data['ay'],
-            z=self.data['az'],
+            x=sub['ax'],
+            y=sub['ay'],
+            z=sub['az'],
             mode='lines',
             line=dict(
-                color=self.data['altitude'],
+                color=sub['altitude'],
                 colorscale='Viridis',
                 width=5
             )
@@ -3,6 +3,7 @@ import machine
 import sdcard
 import uos
 import random
+import struct
 from time import sleep
 
 # Assign chip select (CS) pin (and start it high)
@@ -19,34 +20,53 @@ spi = machine.SPI(1,
                   mosi=machine.Pin(11),
                   miso=machine.Pin(12))
 
+# SPI clock for data transfers once the card is initialised. The driver runs
+# the identification sequence at 100 kHz and only then switches to this rate.
+SD_BAUDRATE = 25000000
+
 # Initialize SD card
-sd = sdcard.SDCard(spi, cs)
+sd = sdcard.SDCard(spi, cs, baudrate=SD_BAUDRATE)
 
 # Mount filesystem
 vfs = uos.VfsFat(sd)
 uos.mount(vfs, "/sd")
 
-while True:
-    # Generate random data
-    temperature = random.uniform(20.0, 30.0)  # Random temperature between 20-30°C
-    humidity = random.uniform(40.0, 60.0)     # Random humidity between 40-60%
-    pressure = random.uniform(980.0, 1020.0)  # Random pressure between 980-1020 hPa
-    light = random.randint(0, 1000)          # Random light level between 0-1000
-
-    # Create a file in the SD card root directory and write data
-    with open("/sd/sensor_data.csv", "a") as file:
-        # Format data with 2 decimal places for floating point values
-        data_str = "{:.2f},{:.2f},{:.2f},{}\n".format(
-            temperature,
-            humidity,
-            pressure,
-            light
-        )
-        file.write(data_str)
-
-    # Read and print the contents of the file
-    with open("/sd/sensor_data.csv", "r") as file:
-        data = file.read()
-        print(data)
-    
-    sleep(1)  # Wait for 1 second before next reading
\ No newline at end of file
+# Binary record: temperature, humidity, pressure (float32) and light (uint32)
+RECORD_FORMAT = "<fffI"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Records are packed into whole blocks before they reach the card
+BLOCK_SIZE = 4096
+
+# Ping-pong buffers: one fills while the other is written out. The block
+# size is a multiple of the record size, so records never straddle them.
+cur = bytearray(BLOCK_SIZE)
+spare = bytearray(BLOCK_SIZE)
+off = 0
+
+# Keep one append handle open instead of reopening the file every reading
+file = open("/sd/sensor_data.bin", "ab")
+
+try:
+    while True:
+        # Generate random data
+        temperature = random.uniform(20.0, 30.0)  # Random temperature between 20-30°C
+        humidity = random.uniform(40.0, 60.0)     # Random humidity between 40-60%
+        pressure = random.uniform(980.0, 1020.0)  # Random pressure between 980-1020 hPa
+        light = random.randint(0, 1000)          # Random light level between 0-1000
+
+        struct.pack_into(RECORD_FORMAT, cur, off, temperature, humidity, pressure, light)
+        off += RECORD_SIZE
+        if off == BLOCK_SIZE:
+            # Swap buffers and write the full block
+            cur, spare = spare, cur
+            file.write(spare)
+            off = 0
+
+        print(temperature, humidity, pressure, light)
+        
+        sleep(1)  # Wait for 1 second before next reading
+finally:
+    # Write out the partly filled block
+    file.write(memoryview(cur)[:off])
+    file.close()
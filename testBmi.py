@@ -1,18 +1,112 @@
 # Improved BME280 Test Program for Raspberry Pi Pico
 # Tests temperature, pressure, and altitude readings with robust error handling
 
+import array
 import time
-from machine import Pin, I2C
+import machine
+from machine import Pin, I2C, lightsleep
+from micropython import const
 # Import the BME280 class
 # Note: Save the fixed module as bme280.py on your Pico
 from bme280 import BME280
 
+# Set to True to compile debug mode switching into the measurement loop; when
+# False those branches are dropped by the compiler
+_DEBUG = const(False)
+
+# Report every reading; set False to only report status and errors, so USB
+# serial traffic doesn't keep waking the chip between samples
+VERBOSE = True
+
+# One table row per reading: temperature, pressure, altitude
+ROW_FMT = "{:13.2f} | {:12.2f} | {:10.2f}"
+
+# Time between readings, spent in light sleep
+SAMPLE_INTERVAL_MS = 2000
+
+# Readings kept in RAM for download; the oldest are overwritten when full
+LOG_SAMPLES = 256
+
+# Ring buffer of (temperature, pressure, altitude) triples
+log = array.array('f', [0.0] * (LOG_SAMPLES * 3))
+log_idx = 0
+log_full = False
+
+
+def log_reading(temperature, pressure, altitude):
+    """Store one reading in the ring buffer, dropping the oldest when full"""
+    global log_idx, log_full
+    log[log_idx] = temperature
+    log[log_idx + 1] = pressure
+    log[log_idx + 2] = altitude
+    log_idx += 3
+    if log_idx == len(log):
+        log_idx = 0
+        log_full = True
+
+
+def dump_log(out=None):
+    """
+    Write the logged readings oldest first as CSV rows
+    
+    Args:
+        out: Open file to write to; prints to the console if None
+    """
+    start = log_idx if log_full else 0
+    count = LOG_SAMPLES if log_full else log_idx // 3
+    size = len(log)
+    for n in range(count):
+        i = (start + 3 * n) % size
+        row = "{:.2f},{:.2f},{:.2f}".format(log[i], log[i + 1], log[i + 2])
+        if out is None:
+            print(row)
+        else:
+            out.write(row + "\n")
+
+
+# VBUS sense: high while the board is powered over USB (GP24 on the Pico)
+vbus = Pin(24, Pin.IN)
+
+# Status and error messages kept in RAM, oldest overwritten first
+MSG_SLOTS = 32
+messages = [None] * MSG_SLOTS
+msg_idx = 0
+
+
+def report(msg):
+    """
+    Keep a message in the ring and print it only while USB is attached
+    
+    print() to USB serial blocks once the host stops draining it, so with
+    the cable unplugged messages are only buffered.
+    
+    Args:
+        msg: Message string
+    """
+    global msg_idx
+    messages[msg_idx] = msg
+    msg_idx = (msg_idx + 1) % MSG_SLOTS
+    if vbus.value():
+        try:
+            print(msg)
+        except OSError:
+            pass
+
+
+# The loop is bound by the bus and the sleep between readings, so the whole
+# test runs at a low clock. It is set once, before the I2C bus is created,
+# because the I2C divider is derived from the clock at init.
+machine.freq(48000000)
+
 # Define I2C pins (use the default I2C0 on the Pico)
 i2c_sda = Pin(18)  # GP0 - Pin 1
 i2c_scl = Pin(19)  # GP1 - Pin 2
 
-# Initialize I2C with a reasonable frequency
-i2c = I2C(1, sda=i2c_sda, scl=i2c_scl, freq=100000)
+# Initialize I2C in Fast-mode (400 kHz). The BME280 never stretches the
+# clock, so a short timeout bounds a stalled transfer instead of the 50 ms
+# default.
+I2C_TIMEOUT_US = 5000
+i2c = I2C(1, sda=i2c_sda, scl=i2c_scl, freq=400000, timeout=I2C_TIMEOUT_US)
 
 # Check for available I2C devices
 print("\n=== BME280 Test Program ===")
@@ -34,31 +128,27 @@ try:
     
     # First read to verify all functions work
     print("\nTesting initial readings:")
-    data = bme.read_all()
-    if data["temperature"] is not None:
-        print(f"✓ Temperature: {data['temperature']}°C")
+    temperature, pressure, altitude = bme.read_tuple()
+    if temperature is not None:
+        print(f"✓ Temperature: {temperature}°C")
     else:
         print("✗ Temperature reading failed")
         
-    if data["pressure"] is not None:
-        print(f"✓ Pressure: {data['pressure']} hPa")
+    if pressure is not None:
+        print(f"✓ Pressure: {pressure / 100.0} hPa")
     else:
         print("✗ Pressure reading failed")
         
-    if data["altitude"] is not None:
-        print(f"✓ Altitude: {data['altitude']} m (uncalibrated)")
+    if altitude is not None:
+        print(f"✓ Altitude: {altitude} m (uncalibrated)")
     else:
         print("✗ Altitude calculation failed")
     
-    # If initial readings successful, continue with calibration
-    if data["temperature"] is not None or data["pressure"] is not None:
-        # Calibrate the sensor for ground level altitude
-        print("\nCalibrating ground level...")
-        calibration_success = bme.calibrate_ground_level(samples=3, delay=1.0)
-        if calibration_success:
-            print("Ground level calibration completed successfully")
-        else:
-            print("Ground level calibration failed, using sea level as reference")
+    # If initial readings successful, continue with measurements
+    if temperature is not None or pressure is not None:
+        # Track ground level from the readings themselves rather than a
+        # separate blocking calibration phase
+        bme.track_ground = True
         
         # Optional: If you have a known reference temperature, you can recalibrate
         # For example, if you know the current temperature is 23.5°C:
@@ -73,46 +163,76 @@ try:
         
         sample_count = 0
         error_count = 0
+        pending_diag = False
         
         # Turn off debug mode for continuous readings
         bme.debug = False
         
+        # Reading fetched on the previous pass, handled while the next
+        # conversion runs
+        previous = None
+        
         try:
             while True:
-                # Read sensor data
-                sample_count += 1
-                data = bme.read_all()
+                # Start the next conversion first so the sensor works while
+                # the previous reading is logged and reported
+                ready_at = time.ticks_add(time.ticks_ms(), bme.start_measurement())
                 
-                # Format and display readings
-                if None not in (data["temperature"], data["pressure"], data["altitude"]):
-                    print(f"{data['temperature']:13.2f} | {data['pressure']:12.2f} | {data['altitude']:10.2f}")
-                    error_count = 0  # Reset error count when successful
-                else:
-                    print("Error reading sensor data:")
-                    if data["temperature"] is None:
-                        print("- Temperature reading failed")
-                    if data["pressure"] is None:
-                        print("- Pressure reading failed")
-                    if data["altitude"] is None:
-                        print("- Altitude calculation failed")
-                    
-                    error_count += 1
+                if previous is not None:
+                    temperature, pressure, altitude = previous
+                    if pressure is not None:
+                        pressure /= 100.0  # Pa to hPa
                     
-                    # If we have multiple consecutive errors, turn debug back on
-                    if error_count >= 3:
-                        bme.debug = True
-                        print("Enabling debug mode due to repeated errors")
-                        print("Stats:", bme.get_altitude_stats())
+                    # Format and display readings
+                    if temperature is not None and pressure is not None and altitude is not None:
+                        log_reading(temperature, pressure, altitude)
+                        if VERBOSE:
+                            report(ROW_FMT.format(temperature, pressure, altitude))
+                        error_count = 0  # Reset error count when successful
+                    else:
+                        report("Error reading sensor data:")
+                        if temperature is None:
+                            report("- Temperature reading failed")
+                        if pressure is None:
+                            report("- Pressure reading failed")
+                        if altitude is None:
+                            report("- Altitude calculation failed")
+                        
+                        error_count += 1
+                        
+                        # If we have multiple consecutive errors, queue the
+                        # diagnostics for after the sleep
+                        if error_count == 3:
+                            if _DEBUG:
+                                bme.debug = True
+                            pending_diag = True
+                
+                # Sleep out whatever is left of the conversion, then collect it
+                remaining = time.ticks_diff(ready_at, time.ticks_ms())
+                if remaining > 0:
+                    lightsleep(remaining)
+                previous = bme.fetch_result()
+                sample_count += 1
+                
+                # Sleep until the next reading; RAM (and these counters) is retained
+                lightsleep(SAMPLE_INTERVAL_MS)
                 
-                # Wait before next reading
-                time.sleep(2)
+                # Slow-path diagnostics, kept out of the measurement itself
+                if pending_diag:
+                    pending_diag = False
+                    if _DEBUG:
+                        report("Enabling debug mode due to repeated errors")
+                    report("Stats: {}".format(bme.get_altitude_stats()))
+                    report("Warnings: {}".format(bme.pop_warnings()))
                 
                 # Every 10 samples, print a status message
                 if sample_count % 10 == 0:
-                    print(f"Completed {sample_count} readings")
+                    report(f"Completed {sample_count} readings")
                     
         except KeyboardInterrupt:
             print("\nStopped by user")
+            print("\nLogged readings (temperature,pressure,altitude):")
+            dump_log()
     else:
         print("Initial sensor readings failed. Check connections and try again.")
         
@@ -1,34 +1,163 @@
-from machine import Pin, ADC
-from time import sleep
+from machine import Pin, ADC, Timer
+import machine
+import array
+import micropython
+from micropython import const
 
 pot1 = ADC(26)
 pot2 = ADC(27)
 
+# Channels are handled by index so one loop body serves all of them. The
+# ADC objects set up the pads; samples are then taken straight from the
+# ADC registers, using the input number (GP26 is AIN0, GP27 is AIN1).
+pots = (pot1, pot2)
+AIN = (0, 1)
+CHANNELS = len(pots)
+
 uv_sensitivity = 0.13
 
-while True:
-    pot_value1 = pot1.read_u16()*3.3/4096
-    print("ADC/Voltage value : {:.6f} V".format(pot_value1))
-    uv_intensity = pot_value1/uv_sensitivity
-    print("UV Intensity: {:.6f} mW/cm²".format(uv_intensity))
-    uv_ind = pot_value1/0.1
-    print("UV Index : {:.6f}".format(uv_ind))
-    photocurrent = pot_value1/4.3
-    print("Photocurrent: {:.6f} A".format(photocurrent))
-    irrad = photocurrent*9
-    print("Irradiance : {:.6f} mW/cm²".format(irrad))
-    print("------------------------------")
+# Sampling: a timer fills the buffers and the loop wakes once per batch
+SAMPLE_HZ = 2
+BATCH = 32
+
+# Race to idle: batches are processed at the fastest in-spec clock, and the
+# core sits at a low clock the rest of the time. Timer and ADC run from
+# their own clocks, so sampling is unaffected by the switch.
+ACTIVE_FREQ = 133000000
+IDLE_FREQ = 48000000
+
+# Conversion factors in Q12 fixed point, applied to millivolts
+_UV_Q = const(31508)      # 4096 / 0.13 (uv_sensitivity)
+_PHOTO_Q = const(953)     # 4096 / 4.3
+_IRRAD_Q = const(8573)    # 4096 * 9 / 4.3
+
+
+@micropython.viper
+def adc_read(ain: int) -> int:
+    """
+    Take one conversion on an ADC input by polling the RP2040 registers
     
-    pot_value2 = pot2.read_u16()*3.3/4096
-    print("ADC/Voltage value : {:.6f} V".format(pot_value2))
-    uv_intensity = pot_value2/uv_sensitivity
-    print("UV Intensity: {:.6f} mW/cm²".format(uv_intensity))
-    uv_ind = pot_value2/0.1
-    print("UV Index : {:.6f}".format(uv_ind))
-    photocurrent = pot_value2/4.3
-    print("Photocurrent: {:.6f} A".format(photocurrent))
-    irrad = photocurrent*9
-    print("Irradiance : {:.6f} mW/cm²".format(irrad))
-    print("------------------------------")
-    print("------------------------------------------------------------------------------------------")
-    sleep(0.5)
\ No newline at end of file
+    Skips the read_u16() method call. The 12-bit result is scaled to 16 bits
+    the same way read_u16() does, so readings are interchangeable.
+    """
+    cs = ptr32(0x4004c000)      # ADC CS
+    result = ptr32(0x4004c004)  # ADC RESULT
+    cs[0] = (ain << 12) | 0x5   # AINSEL, START_ONCE | EN
+    while not (cs[0] & 0x100):  # READY
+        pass
+    r = result[0]
+    return (r << 4) | (r >> 8)
+
+
+@micropython.viper
+def convert_uv(raw: int, out: ptr32):
+    """
+    Convert a raw ADC reading into milli-units without touching floats
+    
+    Fills out with voltage (mV), UV intensity, UV index, photocurrent and
+    irradiance, each scaled by 1000.
+    """
+    v = (raw * 3300) >> 12
+    out[0] = v
+    out[1] = (v * _UV_Q) >> 12
+    out[2] = v * 10
+    out[3] = (v * _PHOTO_Q) >> 12
+    out[4] = (v * _IRRAD_Q) >> 12
+
+
+@micropython.viper
+def batch_stats(buf: ptr16, n: int, out: ptr32):
+    """Store the min, max and sum of the first n raw readings in out[0:3]"""
+    lo = 0xFFFF
+    hi = 0
+    total = 0
+    i = 0
+    while i < n:
+        v = int(buf[i])
+        if v < lo:
+            lo = v
+        if v > hi:
+            hi = v
+        total += v
+        i += 1
+    out[0] = lo
+    out[1] = hi
+    out[2] = total
+
+
+# Two banks of per-channel batch buffers: the timer fills one while the loop
+# reads the other, so a finished batch is never overwritten while in use
+banks = tuple(tuple(array.array('H', [0] * BATCH) for _ in range(CHANNELS))
+              for _ in range(2))
+samples = banks[0]
+sample_idx = 0
+fill_bank = 0
+ready_bank = 0
+batch_ready = False
+
+stats = array.array('i', [0] * 3)
+reading = array.array('i', [0] * 5)
+
+# Whole batch report, formatted and printed in one call
+CHANNEL_FMT = ("ADC/Voltage value : {:.3f} V (min {:.3f}, max {:.3f})\n"
+               "UV Intensity: {:.3f} mW/cm²\n"
+               "UV Index : {:.3f}\n"
+               "Photocurrent: {:.3f} A\n"
+               "Irradiance : {:.3f} mW/cm²\n"
+               "------------------------------\n")
+REPORT_FMT = CHANNEL_FMT * CHANNELS + "-" * 90
+
+
+# VBUS sense: high while the board is powered over USB (GP24 on the Pico)
+vbus = Pin(24, Pin.IN)
+
+# Recent reports kept in RAM, oldest overwritten first
+MSG_SLOTS = 8
+messages = [None] * MSG_SLOTS
+msg_idx = 0
+
+
+def report(msg):
+    """Keep a report in the ring and print it only while USB is attached"""
+    global msg_idx
+    messages[msg_idx] = msg
+    msg_idx = (msg_idx + 1) % MSG_SLOTS
+    if vbus.value():
+        try:
+            print(msg)
+        except OSError:
+            pass
+
+
+def sample(timer):
+    """Timer callback: store one reading per channel, swap banks on each full batch"""
+    global samples, sample_idx, fill_bank, ready_bank, batch_ready
+    for ch in range(CHANNELS):
+        samples[ch][sample_idx] = adc_read(AIN[ch])
+    sample_idx += 1
+    if sample_idx == BATCH:
+        sample_idx = 0
+        ready_bank = fill_bank
+        fill_bank ^= 1
+        samples = banks[fill_bank]
+        batch_ready = True
+
+
+timer = Timer(freq=SAMPLE_HZ, mode=Timer.PERIODIC, callback=sample)
+machine.freq(IDLE_FREQ)
+
+while True:
+    if batch_ready:
+        batch_ready = False
+        machine.freq(ACTIVE_FREQ)
+        
+        batch = banks[ready_bank]
+        args = []
+        for ch in range(CHANNELS):
+            batch_stats(batch[ch], BATCH, stats)
+            convert_uv(stats[2] // BATCH, reading)
+            args.extend((reading[0] / 1000, (stats[0] * 3300 >> 12) / 1000, (stats[1] * 3300 >> 12) / 1000,
+                         reading[1] / 1000, reading[2] / 1000, reading[3] / 1000, reading[4] / 1000))
+        report(REPORT_FMT.format(*args))
+        machine.freq(IDLE_FREQ)
+    machine.lightsleep(500)